@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+"""
+Measure what the solution cache costs and saves per puzzle: a plain solve, a miss (canonical form and solve), a hit on an
+exact repeat and a hit on a symmetric copy (rows, bands and digits shuffled, transposed), the exit status is 1 if a hit
+is not faster than solving the puzzle
+USAGE: python3 -m Benchmark.benchmark_cache [--count 50] [--seed 0] [--repeat 5]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+import Sudoku_Solver.sudoku_solver as ss
+from Sudoku_Solver.solution_cache import SolutionCache, transpose
+from Benchmark.puzzle_corpus import build_corpus
+
+# Return the same puzzle with its bands, rows within the bands and digits shuffled and transposed, it has the same canonical form
+def symmetric_copy(puzzle, rng):
+    rows = [band*3 + row for band in rng.sample(range(3), 3) for row in rng.sample(range(3), 3)]
+    labels = dict(zip("123456789", rng.sample("123456789", 9)))
+    shuffled = "".join(labels.get(puzzle[r*9+c], "0") for r in rows for c in range(9))
+    return transpose(shuffled)
+
+# Return the best wall time in seconds of call over repeat runs, setup runs before every run and is not timed
+def best_time(call, repeat, setup=None):
+    best = None
+    for _ in range(repeat):
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        call(argument)
+        elapsed = time.perf_counter()-start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+# Time every way through the cache for one puzzle, returns seconds by measurement name
+def measure_puzzle(puzzle, copy, repeat):
+    def warm_cache():
+        cache = SolutionCache(16)
+        cache.solve_sudoku(puzzle)
+        return cache
+    return {
+        "solve": best_time(lambda _: ss.solve_sudoku(puzzle), repeat),
+        "miss": best_time(lambda cache: cache.solve_sudoku(puzzle), repeat, lambda: SolutionCache(16)),
+        "exact hit": best_time(lambda cache: cache.solve_sudoku(puzzle), repeat, warm_cache),
+        "symmetric hit": best_time(lambda cache: cache.solve_sudoku(copy), repeat, warm_cache),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Time solution cache hits and misses against solving the puzzles")
+    parser.add_argument("--count", type=int, default=50, help="generated puzzles of every grade")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated puzzles and their symmetric copies")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of every measurement, the fastest is kept")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = build_corpus(args.count, args.seed)
+    names = ("solve", "miss", "exact hit", "symmetric hit")
+    print("grade".ljust(10) + "".join(("%s ms" % name).rjust(18) for name in names))
+    failures = []
+    for grade, puzzles in corpus.items():
+        timings = [measure_puzzle(puzzle, symmetric_copy(puzzle, rng), args.repeat) for puzzle in puzzles]
+        medians = {name: statistics.median(timing[name] for timing in timings) for name in names}
+        print(grade.ljust(10) + "".join(("%.4f" % (medians[name]*1000)).rjust(18) for name in names))
+        for name in ("exact hit", "symmetric hit"):
+            if medians[name] >= medians["solve"]:
+                failures.append("%s %s takes %.4f ms, solving takes %.4f ms" % (grade, name, medians[name]*1000, medians["solve"]*1000))
+
+    for failure in failures:
+        print("Slow cache: " + failure, file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+"""
+Measure the peak memory allocated while extracting the puzzle of every dataset image with tracemalloc
+and compare the copy free extraction with the stored baseline, the exit status is 1 if any image got worse
+USAGE: python3 -m Benchmark.benchmark_memory [images or directories] [--tolerance 0.1] [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+from settings import MAXIMUM_WIDTH, MAXIMUM_HEIGHT, sudokuImageFolder
+import Displayer.displayer as Displayer
+from Sudoku.resizeSudokuImage import ResizeSudokuImage
+from Extractor.extractSudokuPuzzle import ExtractSudokuPuzzle
+from sudokuImageBatchSolver import findImages
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory_baseline.json")
+
+
+# Return the peak memory in bytes allocated by one extraction, the loaded image itself is not counted
+def measure_extraction(image, display, copy_free):
+    # a first run outside of the measurement loads the lazily initialized parts of OpenCV and NumPy
+    ExtractSudokuPuzzle(image, display, copyFree=copy_free)
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        ExtractSudokuPuzzle(image, display, copyFree=copy_free)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the peak memory of the puzzle extraction against a baseline")
+    parser.add_argument("paths", nargs="*", default=[sudokuImageFolder], help="images or directories of images")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed growth of the peak over the baseline, 0.1 = 10%%")
+    parser.add_argument("--update-baseline", action="store_true", help="store the measured peaks as the new baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    display = Displayer.Display(mode="none")
+    peaks = {}
+    regressions = []
+    print("image".ljust(24) + "legacy KB".rjust(12) + "copy free KB".rjust(14) + "baseline KB".rjust(14))
+    for image_path in findImages(args.paths):
+        name = os.path.basename(image_path)
+        image = ResizeSudokuImage(image_path, MAXIMUM_WIDTH, MAXIMUM_HEIGHT, display).sudokuImage
+        legacy = measure_extraction(image, display, False)
+        peak = measure_extraction(image, display, True)
+        peaks[name] = peak
+        expected = baseline.get(name)
+        print(name.ljust(24) + str(legacy//1024).rjust(12) + str(peak//1024).rjust(14) + (str(expected//1024) if expected else "-").rjust(14))
+        if expected and peak > expected*(1+args.tolerance):
+            regressions.append((name, expected, peak))
+
+    if args.update_baseline:
+        baseline.update(peaks)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print("Baseline written to " + args.baseline)
+        return
+
+    for name, expected, peak in regressions:
+        print("Regression: %s peaks at %d KB, baseline %d KB" % (name, peak//1024, expected//1024), file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
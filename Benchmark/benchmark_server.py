@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+"""
+Load test of a running sudokuServer.py on this machine: clients on kept alive connections send puzzles or images as fast as the
+server answers, then the throughput, the latency percentiles, the responses by status and the batch sizes of the server are printed
+With --check it sends requests the server must refuse without breaking the connection they arrive on instead, the exit
+status is 1 if an answer is wrong
+USAGE: python3 sudokuServer.py & python3 -m Benchmark.benchmark_server [--kind string] [--clients 32] [--requests 2000] [--timeout-ms 2000]
+       python3 sudokuServer.py & python3 -m Benchmark.benchmark_server --check
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+from settings import sudokuImageFolder
+from Benchmark.puzzle_corpus import build_corpus
+from sudokuImageBatchSolver import findImages
+
+# Send requests until the shared counter runs out, every client keeps one connection open
+def run_client(url, path, bodies, counter, lock, timeout_ms, latencies, statuses):
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    headers = {"X-Timeout-Ms": str(timeout_ms)} if timeout_ms else {}
+    while True:
+        with lock:
+            if counter[0] <= 0:
+                break
+            counter[0] -= 1
+            body = bodies[counter[0] % len(bodies)]
+        start = time.perf_counter()
+        connection.request("POST", path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        elapsed = time.perf_counter()-start
+        with lock:
+            latencies.append(elapsed)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+        if response.getheader("Connection", "").lower() == "close":
+            connection.close()
+            connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    connection.close()
+
+def fetch_metrics(url):
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+    connection.request("GET", "/metrics?format=json")
+    metrics = json.loads(connection.getresponse().read())
+    connection.close()
+    return metrics
+
+# Send one request and return its status, whether the server closes the connection and the decoded answer
+def post(connection, path, body, headers=None):
+    connection.request("POST", path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    body = response.read()
+    try:
+        answer = json.loads(body)
+    except ValueError:
+        answer = body.decode("utf-8", "replace")
+    return response.status, response.getheader("Connection", "").lower() == "close", answer
+
+# Send only the headers of a request announcing a body of length bytes, the server must answer before any body arrives,
+# the status is None if it drops the connection or waits for the body instead
+def post_headers_only(url, path, length):
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+    try:
+        connection.putrequest("POST", path)
+        connection.putheader("Content-Length", str(length))
+        connection.endheaders()
+        response = connection.getresponse()
+        response.read()
+    except (http.client.HTTPException, OSError):
+        return None, True
+    finally:
+        connection.close()
+    return response.status, response.getheader("Connection", "").lower() == "close"
+
+# Check the answers to malformed and oversized requests and that the connection still works after them, returns the failures
+def check_server(url, puzzle):
+    failures = []
+    for timeout in ("abc", "nan", "inf"):
+        # the refused request has a body, if it were left unread the next request on the connection would be parsed from it
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+        status, closed, _ = post(connection, "/solve/string", puzzle.encode(), {"X-Timeout-Ms": timeout})
+        if status != 400:
+            failures.append("X-Timeout-Ms %s answered with %d, not 400" % (timeout, status))
+        if closed:
+            connection.close()
+        status, _, answer = post(connection, "/solve/string", json.dumps({"puzzle": puzzle}).encode())
+        if status != 200 or "solution" not in answer:
+            failures.append("the request after X-Timeout-Ms %s on the same connection answered with %d: %s" % (timeout, status, answer))
+        connection.close()
+
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+    status, closed, _ = post(connection, "/solve/string", puzzle.encode()*20)
+    if status != 413 or not closed:
+        failures.append("a %d byte puzzle string answered with %d%s, not 413 and a closed connection" % (len(puzzle)*20, status, "" if closed else " open"))
+    connection.close()
+    for path in ("/solve/string", "/solve/image"):
+        status, closed = post_headers_only(url, path, 10**12)
+        if status != 413 or not closed:
+            failures.append("a %s body of 10**12 bytes answered with %s%s, not 413 and a closed connection" % (path, status, "" if closed else " open"))
+
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+    answers = [post(connection, "/solve/string", puzzle.encode())[0] for _ in range(3)]
+    if answers != [200]*3:
+        failures.append("three puzzles on one connection answered with %s" % answers)
+    connection.close()
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a running sudoku server")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--kind", default="string", choices=("string", "image"))
+    parser.add_argument("--clients", type=int, default=32, help="concurrent connections")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--timeout-ms", type=int, default=None, help="deadline sent with every request, the server default if not given")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated puzzles")
+    parser.add_argument("--check", action="store_true", help="check the answers to malformed and oversized requests instead of load testing")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    if args.check:
+        failures = check_server(url, build_corpus(1, args.seed)["easy"][0])
+        for failure in failures:
+            print("Wrong answer: " + failure, file=sys.stderr)
+        print("%s: %d failures" % (args.url, len(failures)))
+        sys.exit(1 if failures else 0)
+    if args.kind == "string":
+        corpus = build_corpus(50, args.seed)
+        bodies = [puzzle.encode() for grade in ("easy", "medium", "hard", "minimal") for puzzle in corpus[grade]]
+        path = "/solve/string"
+    else:
+        bodies = []
+        for image_path in findImages([sudokuImageFolder]):
+            with open(image_path, "rb") as f:
+                bodies.append(f.read())
+        path = "/solve/image"
+
+    batches_before = fetch_metrics(url)["batchSize"]
+    counter, lock, latencies, statuses = [args.requests], threading.Lock(), [], {}
+    clients = [threading.Thread(target=run_client, args=(url, path, bodies, counter, lock, args.timeout_ms, latencies, statuses)) for _ in range(args.clients)]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter()-start
+    batches = fetch_metrics(url)["batchSize"]
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies)-1, int(p/100*len(latencies)))]*1000
+    print("%d requests in %.2f s: %.1f requests/s" % (len(latencies), elapsed, len(latencies)/elapsed))
+    print("latency ms: p50 %.1f  p90 %.1f  p99 %.1f  max %.1f  mean %.1f" % (percentile(50), percentile(90), percentile(99), latencies[-1]*1000, statistics.mean(latencies)*1000))
+    print("responses: " + ", ".join("%d: %d" % (status, count) for status, count in sorted(statuses.items())))
+    batch_count = batches["count"]-batches_before["count"]
+    if batch_count:
+        print("string batches: %d, mean size %.1f" % (batch_count, (batches["sum"]-batches_before["sum"])/batch_count))
+
+if __name__ == "__main__":
+    main()
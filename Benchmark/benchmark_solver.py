@@ -0,0 +1,49 @@
+#!/usr/bin/python3
+"""
+Compare the solver backends of Sudoku_Solver/sudoku_solver.py on the same puzzles
+USAGE: python3 -m Benchmark.benchmark_solver [--backends bitmask dlx] [--repeat 3] [--include-pathological]
+"""
+
+import argparse
+import time
+import Sudoku_Solver.sudoku_solver as ss
+
+# Example sudokus where .=0
+puzzles = {
+    "easy1": ".94...13..............76..2.8..1.....32.........2...6.....5.4.......8..7..63.4..8",
+    "test1": "070006000900000041008009050090007002003000800400800010080300900160000007000500080",
+}
+
+# Puzzles which take the bitmask backend tens of seconds, timed once and only with --include-pathological
+pathological_puzzles = {
+    "hard1": ".....6....59.....82....8....45........3........6..3.54...325..6..................",
+}
+
+# Return the best wall time in seconds of solving the puzzle repeat times with a backend
+def time_backend(puzzle, backend, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ss.solve_sudoku(puzzle, backend=backend)
+        elapsed = time.perf_counter()-start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the sudoku solver backends against each other")
+    parser.add_argument("--backends", nargs="+", default=["bitmask", "dlx"], choices=sorted(ss.backends))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--include-pathological", action="store_true", help="also time the puzzles which take tens of seconds, once each")
+    args = parser.parse_args()
+
+    runs = [(name, puzzle, args.repeat) for name, puzzle in puzzles.items()]
+    if args.include_pathological:
+        runs += [(name, puzzle, 1) for name, puzzle in pathological_puzzles.items()]
+    print("puzzle".ljust(10) + "".join(backend.rjust(14) for backend in args.backends))
+    for name, puzzle, repeat in runs:
+        timings = [time_backend(puzzle, backend, repeat) for backend in args.backends]
+        print(name.ljust(10) + "".join(("%.4f s" % t).rjust(14) for t in timings))
+
+if __name__ == "__main__":
+    main()
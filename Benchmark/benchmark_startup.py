@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""
+Measure the cold start of the entry points: every statement runs in a new interpreter, as in a short lived worker or CLI call
+Also checks that importing a module does not load the dependencies which are imported lazily, the exit status is 1 if one is
+The modules are compiled to bytecode first, without it (PYTHONDONTWRITEBYTECODE) every start compiles them again and that dominates
+USAGE: python3 -m Benchmark.benchmark_startup [--repeat 10] [--importtime] [--no-compile]
+"""
+
+import argparse
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies loaded only by the steps which need them
+IMAGE_MODULES = ("cv2", "numpy")
+LAZY_MODULES = ("imutils", "pytesseract", "skimage")
+
+# Statement timed in a new interpreter and the modules it must not load
+targets = {
+    "import sudoku_solver": ("import Sudoku_Solver.sudoku_solver", IMAGE_MODULES + LAZY_MODULES + ("json", "Sudoku_Solver.dlx_solver")),
+    "import sudokuApi": ("import sudokuApi", IMAGE_MODULES + LAZY_MODULES),
+    "solve first string": ("import sudokuApi; sudokuApi.solveSudokuString('.94...13..............76..2.8..1.....32.........2...6.....5.4.......8..7..63.4..8')", IMAGE_MODULES + LAZY_MODULES),
+    "import solve_sudoku_from_image": ("import Sudoku_Solver.solve_sudoku_from_image", LAZY_MODULES),
+    "import sudokuImageSolver": ("import sudokuImageSolver", LAZY_MODULES),
+}
+
+# The child times the statement itself and prints its seconds and the forbidden modules it loaded
+CHILD = """
+import sys, time
+start = time.perf_counter()
+exec(sys.argv[1])
+elapsed = time.perf_counter()-start
+print(elapsed, *[name for name in sys.argv[2:] if name in sys.modules])
+"""
+
+# Run the statement in a new interpreter, returns the seconds of the statement, of the whole process and the forbidden modules loaded
+def run_child(statement, forbidden):
+    environment = dict(os.environ, PYTHONPATH=ROOT_FOLDER)
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", CHILD, statement] + list(forbidden), cwd=ROOT_FOLDER, env=environment,
+                            capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), time.perf_counter()-start, output[1:]
+
+# Print the imports of the statement which took the longest, from python -X importtime
+def print_slowest_imports(statement, count=8):
+    environment = dict(os.environ, PYTHONPATH=ROOT_FOLDER)
+    lines = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT_FOLDER, env=environment,
+                           capture_output=True, text=True, check=True).stderr.splitlines()
+    imports = []
+    for line in lines:
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            imports.append((int(parts[1]), parts[2].strip()))
+    for microseconds, name in sorted(imports, reverse=True)[:count]:
+        print("    %8.1f ms  %s" % (microseconds/1000, name))
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the cold start of the entry points in new interpreters")
+    parser.add_argument("--repeat", type=int, default=10, help="new interpreters per statement")
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest imports of every statement")
+    parser.add_argument("--no-compile", action="store_true", help="measure with the bytecode as it is instead of compiling the modules first")
+    args = parser.parse_args()
+
+    if not args.no_compile:
+        compileall.compile_dir(ROOT_FOLDER, quiet=1)
+
+    baseline = [run_child("pass", ())[1] for _ in range(args.repeat)]
+    print("interpreter start up: median %.1f ms" % (statistics.median(baseline)*1000))
+    print("statement".ljust(34) + "min ms".rjust(10) + "median ms".rjust(12) + "process ms".rjust(12))
+    failures = []
+    for name, (statement, forbidden) in targets.items():
+        runs = [run_child(statement, forbidden) for _ in range(args.repeat)]
+        seconds = [run[0] for run in runs]
+        print(name.ljust(34) + ("%.1f" % (min(seconds)*1000)).rjust(10) + ("%.1f" % (statistics.median(seconds)*1000)).rjust(12)
+              + ("%.1f" % (statistics.median(run[1] for run in runs)*1000)).rjust(12))
+        if args.importtime:
+            print_slowest_imports(statement)
+        loaded = sorted(set(module for run in runs for module in run[2]))
+        if loaded:
+            failures.append("%s loads %s" % (name, ", ".join(loaded)))
+
+    for failure in failures:
+        print("Eager import: " + failure, file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/python3
+"""
+Offline benchmark suite of the solver and the image pipeline, compared against a stored baseline
+The solver part times every backend on a generated corpus of every grade and on the hardest puzzles and checks every solution
+The image part times every pipeline stage on the dataset images and compares the recognized grids with Benchmark/expected_grids.json
+Throughput regressions (slower than the baseline by more than the tolerance) and accuracy regressions (wrong solutions,
+fewer correct cells or an image which is no longer solved) are reported on stderr and make the exit status 1
+USAGE: python3 -m Benchmark.benchmark_suite [--parts solver image] [--count 20] [--seed 0] [--repeat 5] [--rounds 3] [--tolerance 0.25] [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from settings import MAXIMUM_WIDTH, MAXIMUM_HEIGHT, BATCH_OCR, FIXED_GRID, sudokuImageFolder
+import Displayer.displayer as Displayer
+import Sudoku_Solver.sudoku_solver as ss
+import Sudoku_Solver.batch_solver as batch_solver
+from Sudoku.resizeSudokuImage import ResizeSudokuImage
+from Extractor.extractSudokuPuzzle import ExtractSudokuPuzzle
+from Sudoku_Solver.solve_sudoku_from_image import SudokuSolver
+from Sudoku.sudokuImageError import SudokuImageError
+from Profiler.pipelineProfiler import PipelineProfiler, aggregateProfiles
+from Benchmark.puzzle_corpus import build_corpus, is_solution_of
+from sudokuImageBatchSolver import findImages
+
+BENCHMARK_FOLDER = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARK_FOLDER, "suite_baseline.json")
+EXPECTED_GRIDS_PATH = os.path.join(BENCHMARK_FOLDER, "expected_grids.json")
+
+# String hashing is randomized per process and changes the layout of the solver dicts and sets, which moves the throughput
+# by up to 30% between runs, so the suite always runs with this hash seed
+HASH_SEED = "0"
+
+# Stages faster than this many seconds are reported but not checked, their timings are mostly noise
+MIN_CHECKED_SECONDS = 0.001
+
+# Solve a list of puzzles with a backend of sudoku_solver.py or with the NumPy batch solver
+def solve_all(puzzles, backend):
+    if backend == "batch":
+        return batch_solver.solve_batch(puzzles)
+    return [ss.solve_sudoku(puzzle, backend=backend) for puzzle in puzzles]
+
+# Return the puzzles solved per second and the number of wrong solutions
+# Every puzzle keeps its fastest of repeat runs, so a pause of the machine only spoils one run of one puzzle
+# The batch solver is timed on the whole corpus at once, solving the puzzles one by one would defeat its vectorization
+def time_solver(puzzles, backend, repeat):
+    groups = [puzzles] if backend == "batch" else [[puzzle] for puzzle in puzzles]
+    total = 0.0
+    solutions = []
+    for group in groups:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            solved = solve_all(group, backend)
+            elapsed = time.perf_counter()-start
+            if best is None or elapsed < best:
+                best = elapsed
+        total += best
+        solutions.extend(solved)
+    wrong = sum(1 for puzzle, solution in zip(puzzles, solutions) if not is_solution_of(puzzle, solution))
+    return len(puzzles)/total, wrong
+
+def run_solver_part(args):
+    corpus = build_corpus(args.count, args.seed)
+    # a first untimed pass keeps the first grade from paying for the warm up of the interpreter and NumPy
+    for backend in args.backends:
+        solve_all(corpus["easy"], backend)
+    results = {"seed": args.seed, "count": args.count, "throughput": {}, "wrong": {}}
+    print("grade".ljust(10) + "".join((backend + " /s").rjust(16) for backend in args.backends))
+    for grade, puzzles in corpus.items():
+        results["throughput"][grade] = {}
+        results["wrong"][grade] = {}
+        for backend in args.backends:
+            throughput, wrong = time_solver(puzzles, backend, args.repeat)
+            results["throughput"][grade][backend] = throughput
+            results["wrong"][grade][backend] = wrong
+        print(grade.ljust(10) + "".join(("%.1f" % results["throughput"][grade][backend]).rjust(16) for backend in args.backends))
+    return results
+
+def create_recognizer(name):
+    if name == "classifier":
+        from Recognizer.digitClassifier import DigitClassifier
+        return DigitClassifier()
+    return None
+
+# Run resize -> extract -> recognize -> solve on one image, returns the recognized grid, whether it was solved and the profile
+def run_pipeline(image_path, display, recognizer):
+    profiler = PipelineProfiler()
+    grid, solved = None, False
+    start = time.perf_counter()
+    try:
+        resized = ResizeSudokuImage(image_path, MAXIMUM_WIDTH, MAXIMUM_HEIGHT, display, profiler=profiler)
+        extracted = ExtractSudokuPuzzle(resized.sudokuImage, display, profiler=profiler)
+        solver = SudokuSolver(extracted.postProcessedExtracted, display, batchOCR=BATCH_OCR, recognizer=recognizer, fixedGrid=FIXED_GRID, profiler=profiler)
+        grid, solved = solver.detected, True
+    except SudokuImageError as error:
+        grid = error.grid
+    except Exception as error:
+        print("%s: %s: %s" % (image_path, type(error).__name__, error), file=sys.stderr)
+    profile = profiler.toDict()
+    profile["stages"]["total"] = {"wall": time.perf_counter()-start, "cpu": 0.0, "calls": 1}
+    return grid, solved, profile
+
+# Number of cells of the recognized grid which match the expected grid, blanks included
+def count_correct_cells(grid, expected):
+    if grid is None or len(grid) != len(expected):
+        return 0
+    return sum(1 for cell, expected_cell in zip(grid.replace(".", "0"), expected) if cell == expected_cell)
+
+def run_image_part(args):
+    with open(args.expected_grids) as f:
+        expected_grids = json.load(f)
+    display = Displayer.Display(mode="none")
+    recognizer = create_recognizer(args.recognizer)
+    image_paths = [path for path in findImages(args.images) if os.path.basename(path) in expected_grids]
+    if image_paths:
+        # loads the lazily initialized parts of OpenCV and the recognizer before anything is timed
+        run_pipeline(image_paths[0], display, recognizer)
+
+    results = {"recognizer": args.recognizer, "images": {}, "stages": {}}
+    profiles = []
+    print("image".ljust(24) + "cells".rjust(8) + "solved".rjust(8) + "ms".rjust(10))
+    for image_path in image_paths:
+        name = os.path.basename(image_path)
+        # every stage keeps its fastest of the repeated runs, the recognized grid is the same every time
+        runs = [run_pipeline(image_path, display, recognizer) for _ in range(args.repeat)]
+        grid, solved, profile = runs[0]
+        for run in runs[1:]:
+            for stage_name, stage in run[2]["stages"].items():
+                fastest = profile["stages"].setdefault(stage_name, stage)
+                fastest["wall"] = min(fastest["wall"], stage["wall"])
+                fastest["cpu"] = min(fastest["cpu"], stage["cpu"])
+        profiles.append(profile)
+        correct = count_correct_cells(grid, expected_grids[name])
+        results["images"][name] = {"grid": grid, "cells_correct": correct, "solved": solved}
+        print(name.ljust(24) + ("%d/81" % correct).rjust(8) + str(solved).rjust(8) + ("%.1f" % (profile["stages"]["total"]["wall"]*1000)).rjust(10))
+
+    for name, stage in aggregateProfiles(profiles)["stages"].items():
+        results["stages"][name] = stage["wall"]["p50"]
+    images = results["images"].values()
+    print("%d of %d cells correct, %d of %d grids exact, %d solved, median %.1f ms per image" % (
+        sum(image["cells_correct"] for image in images), 81*len(images), sum(1 for image in images if image["cells_correct"] == 81),
+        len(images), sum(1 for image in images if image["solved"]), results["stages"].get("total", 0.0)*1000))
+    return results
+
+# Compare the results of both parts with the baseline, returns a list of regression messages
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    solver, solver_baseline = results.get("solver"), baseline.get("solver")
+    if solver is not None:
+        for grade, backends in solver["wrong"].items():
+            for backend, wrong in backends.items():
+                if wrong:
+                    regressions.append("accuracy: %s solved %d %s puzzles wrong" % (backend, wrong, grade))
+        if solver_baseline is not None and (solver_baseline["seed"], solver_baseline["count"]) != (solver["seed"], solver["count"]):
+            print("Solver baseline was measured on another corpus, throughput is not compared", file=sys.stderr)
+        elif solver_baseline is not None:
+            for grade, backends in solver["throughput"].items():
+                for backend, throughput in backends.items():
+                    expected = solver_baseline["throughput"].get(grade, {}).get(backend)
+                    if expected and throughput < expected*(1-tolerance):
+                        regressions.append("throughput: %s solves %.1f %s puzzles/s, baseline %.1f" % (backend, throughput, grade, expected))
+
+    image, image_baseline = results.get("image"), baseline.get("image")
+    if image is not None and image_baseline is not None:
+        if image_baseline["recognizer"] != image["recognizer"]:
+            print("Image baseline was measured with the %s recognizer, it is not compared" % image_baseline["recognizer"], file=sys.stderr)
+            return regressions
+        for name, measured in image["images"].items():
+            expected = image_baseline["images"].get(name)
+            if expected is None:
+                continue
+            if measured["cells_correct"] < expected["cells_correct"]:
+                regressions.append("accuracy: %s has %d correct cells, baseline %d" % (name, measured["cells_correct"], expected["cells_correct"]))
+            if expected["solved"] and not measured["solved"]:
+                regressions.append("accuracy: %s is no longer solved" % name)
+        for name, seconds in image["stages"].items():
+            expected = image_baseline["stages"].get(name)
+            if expected and expected >= MIN_CHECKED_SECONDS and seconds > expected*(1+tolerance):
+                regressions.append("throughput: stage %s takes %.2f ms, baseline %.2f ms" % (name, seconds*1000, expected*1000))
+    return regressions
+
+# Combine the timings of several rounds into the first one with pick (max, min or statistics.median), for throughput and for stage times
+# The recognized grids and wrong solutions are the same in every round
+def combine_rounds(rounds, pick_throughput, pick_seconds):
+    results = rounds[0]
+    if "solver" in results:
+        for grade, backends in results["solver"]["throughput"].items():
+            for backend in backends:
+                backends[backend] = pick_throughput([other["solver"]["throughput"][grade][backend] for other in rounds])
+    if "image" in results:
+        stages = results["image"]["stages"]
+        for name in stages:
+            stages[name] = pick_seconds([other["image"]["stages"][name] for other in rounds if name in other["image"]["stages"]])
+    return results
+
+def run_parts(args):
+    results = {}
+    if "solver" in args.parts:
+        results["solver"] = run_solver_part(args)
+    if "image" in args.parts:
+        results["image"] = run_image_part(args)
+    return results
+
+# Restart the suite with the fixed hash seed unless it already runs with it
+def pin_hash_seed():
+    if os.environ.get("PYTHONHASHSEED") != HASH_SEED:
+        environment = dict(os.environ, PYTHONHASHSEED=HASH_SEED)
+        os.execve(sys.executable, [sys.executable, "-m", __spec__.name] + sys.argv[1:], environment)
+
+def main():
+    pin_hash_seed()
+    parser = argparse.ArgumentParser(description="Benchmark the solver and the image pipeline against a stored baseline")
+    parser.add_argument("--parts", nargs="+", default=["solver", "image"], choices=("solver", "image"))
+    parser.add_argument("--backends", nargs="+", default=["bitmask", "dlx", "batch"], choices=sorted(ss.backends) + ["batch"])
+    parser.add_argument("--count", type=int, default=20, help="generated puzzles of every grade")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated puzzles")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of every measurement, the fastest is kept")
+    parser.add_argument("--images", nargs="+", default=[sudokuImageFolder], help="images or directories of images")
+    parser.add_argument("--expected-grids", default=EXPECTED_GRIDS_PATH)
+    parser.add_argument("--recognizer", default="classifier", choices=("tesseract", "classifier"))
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed loss of throughput against the baseline, 0.25 = 25%%")
+    parser.add_argument("--rounds", type=int, default=3, help="rounds of the whole suite, a new baseline keeps their median and a throughput regression has to show up in all of them")
+    parser.add_argument("--update-baseline", action="store_true", help="store the measured results as the new baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    machine = {"platform": platform.platform(), "python": platform.python_version()}
+    if baseline.get("machine", machine) != machine:
+        print("Baseline was measured on %(platform)s with Python %(python)s, timings may not be comparable" % baseline["machine"], file=sys.stderr)
+
+    if args.update_baseline:
+        # the baseline is a typical round, the median of all of them
+        results = combine_rounds([run_parts(args) for _ in range(args.rounds)], statistics.median, statistics.median)
+        # the part which was not run keeps its baseline
+        baseline.update(results)
+        baseline["machine"] = machine
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print("Baseline written to " + args.baseline)
+        return
+
+    # on a shared machine a whole round can run slower, a throughput regression has to show up in every round
+    rounds = [run_parts(args)]
+    regressions = find_regressions(rounds[0], baseline, args.tolerance)
+    while len(rounds) < args.rounds and any(regression.startswith("throughput") for regression in regressions):
+        print("Round %d of %d" % (len(rounds)+1, args.rounds), file=sys.stderr)
+        rounds.append(run_parts(args))
+        regressions = find_regressions(combine_rounds(rounds, max, min), baseline, args.tolerance)
+    for regression in regressions:
+        print("Regression: " + regression, file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+"""
+Reproducible sudoku corpus for the benchmarks: puzzles generated from a seed at graded difficulty and well known hard puzzles
+The same seed gives the same puzzles on every machine, so timings of different revisions are comparable
+"""
+
+import random
+import Sudoku_Solver.sudoku_solver as ss
+import Sudoku_Solver.bitmask_solver as bitmask_solver
+
+# Clues left in a generated puzzle of every grade, None removes clues until no clue can be removed without losing uniqueness
+grades = {
+    "easy": 40,
+    "medium": 32,
+    "hard": 26,
+    "minimal": None,
+}
+
+# Puzzles known to be hard for backtracking solvers
+# hard1 from sudoku_solver.py is left out, it has many solutions and the bitmask search needs more than 600000 nodes (tens of seconds) for it
+hardest = {
+    "ai_escargot": "1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..",
+    "easter_monster": "1.......2.9.4...5...6...7...5.9.3.......7.......85..4.7.....6...3...9.8...2.....1",
+    "inkala_2012": "8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..",
+    "seventeen_clues": "...8.1..........435............7.8........1...2..3....6......75..34........2..6..",
+}
+
+# Return a random solved grid as a string of 81 digits
+# The pattern (row*3 + row//3 + column) % 9 is a valid grid, relabelling digits and shuffling rows, columns, bands and stacks keeps it valid
+def random_solution(rng):
+    def shuffled_lines():
+        groups = rng.sample(range(3), 3)
+        return [group*3 + line for group in groups for line in rng.sample(range(3), 3)]
+    row_order = shuffled_lines()
+    column_order = shuffled_lines()
+    digit_order = rng.sample("123456789", 9)
+    grid = [[digit_order[(r*3 + r//3 + c) % 9] for c in column_order] for r in row_order]
+    if rng.random() < 0.5:
+        grid = [list(column) for column in zip(*grid)]
+    return "".join("".join(row) for row in grid)
+
+# Remove clues of a solved grid in random order as long as the puzzle keeps exactly one solution
+def remove_clues(solution, clues, rng):
+    puzzle = list(solution)
+    given = 81
+    for index in rng.sample(range(81), 81):
+        if clues is not None and given <= clues:
+            break
+        digit = puzzle[index]
+        puzzle[index] = "0"
+        if ss.count_solutions("".join(puzzle), limit=2) == 1:
+            given -= 1
+        else:
+            puzzle[index] = digit
+    return "".join(puzzle)
+
+# Return count puzzles of the given grade, the same seed always gives the same puzzles
+def generate(grade, count, seed=0):
+    rng = random.Random("%s-%s" % (seed, grade))
+    return [remove_clues(random_solution(rng), grades[grade], rng) for _ in range(count)]
+
+# Return the corpus as a dict of grade -> list of puzzle strings, the hardest puzzles are the last grade
+def build_corpus(count, seed=0):
+    corpus = {grade: generate(grade, count, seed) for grade in grades}
+    corpus["hardest"] = list(hardest.values())
+    return corpus
+
+# Check that solution solves puzzle: every row, column and block holds all digits and the givens are kept
+def is_solution_of(puzzle, solution):
+    if solution is False or solution is None:
+        return False
+    grid = "".join(solution[cell] for cell in ss.cells) if isinstance(solution, dict) else solution
+    if len(grid) != 81 or any(p not in ".0" and p != g for p, g in zip(puzzle, grid)):
+        return False
+    return all(sorted(grid[index] for index in unit) == list("123456789") for unit in bitmask_solver.units)
@@ -8,32 +8,67 @@ USAGE: python3 sudokuImageSolver.py to launch in GUI and python3 sudokuImageSolv
 
 import cv2
 import numpy as np
-from copy import deepcopy
-from settings import DISPLAY_IMG, OUTPUT_PATH
 import os
+import settings
 
+#none: show nothing (production), record: keep images in memory, directory: write images to a directory, interactive: show in a window
+DISPLAY_MODES=("none","record","directory","interactive")
 
+
+"""
+Sink for the images of every stage of the pipeline
+An image can be given as a function returning it, so debug overlays are only drawn when the sink uses them
+"""
 class Display:
 	images=None
-	def __init__(self,graphicalUserInterface=False):
+	def __init__(self,graphicalUserInterface=False,mode=None,directory=None):
 		self.graphicalUserInterface=graphicalUserInterface
 		self.images=[]
 
+		#without an explicit mode DISPLAY_IMG in settings decides between a window and nothing
+		if(mode is None):
+			mode="interactive" if settings.DISPLAY_IMG else "none"
+		if(mode not in DISPLAY_MODES):
+			raise ValueError("Error in Display: mode must be one of "+", ".join(DISPLAY_MODES))
+		if(mode=="directory"):
+			if(directory is None):
+				raise ValueError("Error in Display: directory mode needs a directory")
+			os.makedirs(directory,exist_ok=True)
+		self.mode=mode
+		self.directory=directory
+		self.imageCount=0
+
+	def isActive(self):
+		return self.mode!="none"
+
 	def displayImage(self,image,title="Sudoku Puzzle"):
-		if(not DISPLAY_IMG):
+		if(not self.isActive()):
 			return
+		if(callable(image)):
+			image=image()
+
+		if(self.mode=="record"):
+			self.images.append((title,image.copy()))
+		elif(self.mode=="directory"):
+			self.imageCount+=1
+			filename="%02d_%s.png"%(self.imageCount,title.replace(" ","_"))
+			cv2.imwrite(os.path.join(self.directory,filename),image)
 		else:
 			cv2.imshow(title,image)
-			cv2.imwrite(OUTPUT_PATH, image)
 			cv2.waitKey(0)
 
+	def close(self):
+		if(self.mode=="interactive"):
+			cv2.destroyAllWindows()
+
 
 """
 This method finds the largest connected pixel structure in image and returns the seed of it
+The white pixels are labelled into 4-connected components in one pass, the seed of a component is its first pixel inside the search area
+Without featureImage the image with only the feature in white is not built (None is returned for it) and the corner points
+are taken from the labels of the same pass
 """
-def findLargestFeatureInImage(image,topLeft=None,bottomRight=None):
-	img=deepcopy(image)
-
+def findLargestFeatureInImage(image,topLeft=None,bottomRight=None,featureImage=True):
 	height,width=image.shape[:2]
 
 	if(topLeft is None):
@@ -48,87 +83,110 @@ def findLargestFeatureInImage(image,topLeft=None,bottomRight=None):
 		raise ValueError("Error in findLargestFeatureInImage: coordinate of topLeft and bottomRight cannot be larger than the image it")
 
 
-	maximumArea=0
 	seed=None
 
-	for y in range(topLeft[1],bottomRight[1]):
-		for x in range(topLeft[0],bottomRight[0]):
-			if(img.item(y,x)==255 and x<width and y<height):
-				#flood fill current feature with grey
-				featureArea=cv2.floodFill(img,None,(x,y),64)
-				if(featureArea[0]>maximumArea):
-					maximumArea=featureArea[0]
-					seed=(x,y)
-
-	feature, cornerPoints=computeBoundingBoxOfFeature(image,seed,boundingBox=False)
+	#label every white feature, area of each label is in stats
+	labelCount,labels,stats,centroids=cv2.connectedComponentsWithStats((image==255).astype(np.uint8),connectivity=4)
+
+	area=labels[max(topLeft[1],0):bottomRight[1],max(topLeft[0],0):bottomRight[0]]
+	largestLabel=None
+	if(area.shape==labels.shape and labelCount>1):
+		#the search area is the whole image, so the areas in stats decide and only equally large features are scanned for their first pixel
+		featureAreas=stats[1:,cv2.CC_STAT_AREA]
+		featureLabels=np.flatnonzero(featureAreas==featureAreas.max())+1
+		#the first pixel of a feature is in the top row of its bounding box
+		firstPixels=[]
+		for label in featureLabels:
+			top=stats[label,cv2.CC_STAT_TOP]
+			firstPixels.append(top*width+int(np.argmax(labels[top]==label)))
+		largest=int(np.argmin(firstPixels))
+		largestLabel=int(featureLabels[largest])
+		y,x=divmod(firstPixels[largest],width)
+		seed=(x,y)
+	elif(area.size>0):
+		#first pixel of every feature inside the search area, label 0 is the background
+		featureLabels,firstPixels=np.unique(area,return_index=True)
+		firstPixels=firstPixels[featureLabels>0]
+		featureLabels=featureLabels[featureLabels>0]
+		if(len(featureLabels)>0):
+			#largest feature, on equal area the one which is found first
+			featureAreas=stats[featureLabels,cv2.CC_STAT_AREA]
+			largest=np.lexsort((firstPixels,-featureAreas))[0]
+			largestLabel=int(featureLabels[largest])
+			y,x=divmod(int(firstPixels[largest]),area.shape[1])
+			seed=(max(topLeft[0],0)+x,max(topLeft[1],0)+y)
+
+	if(featureImage):
+		feature, cornerPoints=computeBoundingBoxOfFeature(image,seed,boundingBox=False)
+	else:
+		feature=None
+		ys=xs=np.empty(0,dtype=np.intp)
+		if(largestLabel is not None):
+			#only the bounding box of the feature is searched for its pixels
+			left,top,boxWidth,boxHeight=stats[largestLabel,:4]
+			ys,xs=np.nonzero(labels[top:top+boxHeight,left:left+boxWidth]==largestLabel)
+			ys=ys+top; xs=xs+left
+		cornerPoints=computeCornerPoints(ys,xs,height,width,boundingBox=False)
 
 	return feature,cornerPoints,seed
 
 """
 This method returns a box (or corner points if includeBoundingBox is False) bounding the connected pixels on (x,y)
 1. We will first fill all features in the image with grey
-2. Then we fill all the zero valued pixels in the same connected component as seed with white
+2. Then we fill all the pixels in the same connected component as seed with white
 3. We then fill all those grey pixels with black
-4. By looping through all the pixels, we can examine the whites and compute the corner points or bounding box of it
+4. From the coordinates of the white pixels we compute the corner points or bounding box of it
 """
 def computeBoundingBoxOfFeature(image,seed,boundingBox=True):
-	sudokuImage=deepcopy(image)
 	height,width=image.shape[:2]
 
-	#https://docs.opencv.org/2.4/modules/imgproc/doc/miscellaneous_transformations.html?highlight=floodfill#floodfill
-	mask=np.zeros((height+2,width+2),np.uint8)
-
-	#flood fill all features with grey
-	for y in range(height):
-		for x in range(width):
-			if(sudokuImage.item(y,x)==255 and x<width and y<height):
-				cv2.floodFill(sudokuImage,None,(x,y),64)
+	#fill all features with grey
+	sudokuImage=np.where(image==255,np.uint8(64),image).astype(image.dtype)
 
-	#flood fill all zero valued pixels in the same connected component as seed with white
-	#after this step only the target feature will be white in the input image, everything else will be black/grey
+	#the target feature is the connected component of pixels with the same value as seed
+	feature=np.zeros((height,width),dtype=bool)
 	if(seed is not None):
 		if(seed[0] is not None and seed[1] is not None):
-			cv2.floodFill(sudokuImage,mask,seed,255)
+			seedValue=sudokuImage[seed[1],seed[0]]
+			labelCount,labels=cv2.connectedComponents((sudokuImage==seedValue).astype(np.uint8),connectivity=4)
+			feature=labels==labels[seed[1],seed[0]]
 
+	#after this step only the target feature will be white in the input image, everything else will be black
+	sudokuImage[sudokuImage==64]=0
+	sudokuImage[feature]=255
+
+	#coordinates of the target feature in row by row order
+	ys,xs=np.nonzero(feature)
+	cornerPoints=computeCornerPoints(ys,xs,height,width,boundingBox)
+
+	return sudokuImage,cornerPoints
+
+"""
+Corner points (or bounding box) of the pixels at ys, xs given in row by row order
+"""
+def computeCornerPoints(ys,xs,height,width,boundingBox=True):
 	#we initialize our corner points to be the opposite of their points, 
 	#for example, the coordinates for top left will be coordinates of bottom right, coordinates of top right will be coordinates of bottom left and so on
 	#this allows us to make the safe assumption that if the area is negative or if the area is small, there is no digit in the image
 	topLine=height; bottomLine=0; leftLine=width; rightLine=0
 	topLeft=(width,height); topRight=(0,height); bottomLeft=(width,0); bottomRight=(0,0)
 
-	for y in range(height):
-		for x in range(width):
-			if(sudokuImage.item(y,x)==64):
-				#colour everything that is not our target feature with black colour
-				cv2.floodFill(sudokuImage,mask,(x,y),0)
-			#if this is our target feature, we compute the corner point/bounding box of it
-			if(sudokuImage.item(y,x)==255):
-				if(boundingBox):
-					if(x<leftLine):
-						leftLine=x
-
-					if(x>rightLine):
-						rightLine=x
-
-					if(y<topLine):
-						topLine=y
-
-					if(y>bottomLine):
-						bottomLine=y
-				else:
-					##Idea:
-					#our initial topLeft (width,height) has the max sum of the image. topLeft should be coordinates with minimum sum
-					if(x+y<sum(topLeft)):
-						topLeft=(x,y)
-					#our initial bottomRight (0,0) has the minimum sum of the image. bottomRight should be coordinates with maximum sum
-					if(x+y>sum(bottomRight)):
-						bottomRight=(x,y)
-					#our initial topRight (0,height) has the minimum difference between x and y of the image. topRight should have maximum difference between x and y
-					if(x-y>topRight[0]-topRight[1]):
-						topRight=(x,y)
-					#our initial bottomLeft (width,0) has the maximum difference between x and y of the image. bottomLeft should have minimum difference between x and y
-					if(x-y<bottomLeft[0]-bottomLeft[1]):
-						bottomLeft=(x,y)
+	if(len(xs)>0):
+		if(boundingBox):
+			leftLine=int(xs.min()); rightLine=int(xs.max())
+			topLine=int(ys.min()); bottomLine=int(ys.max())
+		else:
+			##Idea:
+			#topLeft has the minimum sum of x and y, bottomRight has the maximum sum
+			#topRight has the maximum difference between x and y, bottomLeft has the minimum difference
+			#argmin and argmax return the first of equal points, like a row by row scan
+			s=xs+ys
+			difference=xs-ys
+			corner=lambda i: (int(xs[i]),int(ys[i]))
+			topLeft=corner(np.argmin(s))
+			bottomRight=corner(np.argmax(s))
+			topRight=corner(np.argmax(difference))
+			bottomLeft=corner(np.argmin(difference))
 
 
 	if boundingBox:
@@ -138,4 +196,4 @@ def computeBoundingBoxOfFeature(image,seed,boundingBox=True):
 	else:
 		cornerPoints=np.array([topLeft,topRight,bottomRight,bottomLeft],dtype="float32")
 
-	return sudokuImage,cornerPoints
+	return cornerPoints
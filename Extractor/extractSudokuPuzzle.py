@@ -7,34 +7,73 @@ Retrieved from: https://github.com/fzy1995/SudokuImageSolver
 
 import cv2
 import numpy as np
+import settings
 import Displayer.displayer as Displayer
 from copy import deepcopy
-from skimage import exposure
+from Sudoku.sudokuImageError import SudokuImageError
+from Profiler.pipelineProfiler import NULL_PROFILER
 
 
 class ExtractSudokuPuzzle:
 	preprocessedExtracted=None
 	postProcessedExtracted=None
+	#corners of the puzzle (top left, top right, bottom right, bottom left) and the transform to its top down view
+	quadrangle=None
+	perspectiveTransform=None
+	warpedSize=None
 
-	def __init__(self,sudokuImage,display):
+	"""
+	If the corners of the puzzle are already known (e.g. tracked from the previous video frame) the grid search is skipped
+	Otherwise the grid is searched on an image halved pyramidLevels times and its corners are refined on the full image
+	In copyFree mode no image is built only for debug drawing and the warped puzzle is resized once for both results
+	"""
+	def __init__(self,sudokuImage,display,quadrangle=None,pyramidLevels=None,copyFree=None,profiler=NULL_PROFILER):
 		self.display=display
-
-		grayscale=cv2.cvtColor(sudokuImage,cv2.COLOR_BGR2GRAY)
-		preprocessed=self.preprocessImage(grayscale)
-		
-		#Find sudoku puzzle with the largest contour and largest feature 
-		image, quadrangle=self.findSudokuPuzzleGrid(preprocessed,sudokuImage)
+		self.profiler=profiler
+		if(pyramidLevels is None):
+			pyramidLevels=settings.DETECTION_PYRAMID_LEVELS
+		if(copyFree is None):
+			copyFree=settings.COPY_FREE_EXTRACTION
+		self.copyFree=copyFree
+
+		if(quadrangle is None):
+			with profiler.stage("preprocessImage"):
+				grayscale=cv2.cvtColor(sudokuImage,cv2.COLOR_BGR2GRAY)
+				smallGrayscale=grayscale
+				for level in range(pyramidLevels):
+					smallGrayscale=cv2.pyrDown(smallGrayscale)
+				preprocessed=self.preprocessImage(smallGrayscale,pyramidLevels)
+
+			#The overlays of the grid search are drawn on the pyramid level it ran on
+			detectionImage=sudokuImage
+			if(pyramidLevels>0 and (self.display.isActive() or not copyFree)):
+				detectionImage=cv2.cvtColor(smallGrayscale,cv2.COLOR_GRAY2BGR)
+
+			#Find sudoku puzzle with the largest contour and largest feature 
+			image, quadrangle=self.findSudokuPuzzleGrid(preprocessed,detectionImage,minArea=300/4**pyramidLevels)
+			if(pyramidLevels>0):
+				with profiler.stage("refineQuadrangle"):
+					quadrangle=self.refineQuadrangle(grayscale,np.asarray(quadrangle,dtype="float32")*2**pyramidLevels,2**pyramidLevels)
+		self.quadrangle=np.asarray(quadrangle,dtype="float32")
+		quadrangle=self.quadrangle
 
 		#Compute the maximum height and width of sudoku puzzle based of the 4 corners
 		maxWidth,maxHeight=self.computeMaxWidthAndHeightOfSudokuPuzzle(quadrangle)
+		#corners which collapsed onto a line or a point leave less than a pixel per cell, there is no puzzle to warp
+		if(maxWidth<9 or maxHeight<9):
+			raise SudokuImageError("Error in ExtractSudokuPuzzle: The corners of the sudoku puzzle do not enclose a grid.")
 
 		#Warps the sudoku puzzle to get a top down view
-		warpedSudokuPuzzle=self.extractSudokuPuzzleAndWarpPerspective(quadrangle,maxWidth,maxHeight,sudokuImage)
+		with profiler.stage("warpPerspective"):
+			warpedSudokuPuzzle=self.extractSudokuPuzzleAndWarpPerspective(quadrangle,maxWidth,maxHeight,sudokuImage)
 
 		#Resize the extracted sudoku puzzle, convert it to grayscale and rescale intensity of it
-		postProcessed=self.postProcessExtractedSudokuPuzzle(warpedSudokuPuzzle)
-
-		self.preprocessedExtracted=self.postProcessExtractedSudokuPuzzle(warpedSudokuPuzzle,postProcess=False)
+		with profiler.stage("postProcess"):
+			if(copyFree):
+				self.preprocessedExtracted,postProcessed=self.resizeAndPostProcessSudokuPuzzle(warpedSudokuPuzzle)
+			else:
+				postProcessed=self.postProcessExtractedSudokuPuzzle(warpedSudokuPuzzle)
+				self.preprocessedExtracted=self.postProcessExtractedSudokuPuzzle(warpedSudokuPuzzle,postProcess=False)
 		self.postProcessedExtracted=postProcessed
 		#self.image=warpedSudokuPuzzle
 		
@@ -44,23 +83,30 @@ class ExtractSudokuPuzzle:
 	2. Erosion to close the small holes in the object
 	3. Change the image into black and white using adaptive threshold
 	4. Return the threshold 
+	On a halved image the filter, kernel and threshold windows are halved as well, otherwise the grid merges with the text around it
 	"""
-	def preprocessImage(self,sudokuImage):
-		blurred=cv2.bilateralFilter(sudokuImage,5,75,75)
+	def preprocessImage(self,sudokuImage,pyramidLevels=0):
+		if(pyramidLevels==0):
+			filterSize,kernelSize,blockSize=5,9,11
+		else:
+			filterSize,kernelSize,blockSize=3,5,5
+		blurred=cv2.bilateralFilter(sudokuImage,filterSize,75,75)
 
-		kernel=cv2.getStructuringElement(cv2.MORPH_ELLIPSE,(9,9))
+		kernel=cv2.getStructuringElement(cv2.MORPH_ELLIPSE,(kernelSize,kernelSize))
 		#removes small holes, smoothen the contour in the image
 		closed=cv2.morphologyEx(blurred,cv2.MORPH_CLOSE,kernel)
 		
-		div=np.float32(blurred)/(closed)
+		#the division and normalization work in place on a single float image
+		div=np.float32(blurred)
+		np.divide(div,closed,out=div)
 		normalized=np.uint8(cv2.normalize(div,div,0,255,cv2.NORM_MINMAX))
 		#perform adaptive threshold to turn the image into binary image (anything that's larger than threshold get turned into different colour)
-		threshold=cv2.adaptiveThreshold(normalized,255,cv2.ADAPTIVE_THRESH_MEAN_C,cv2.THRESH_BINARY,11,2)
+		threshold=cv2.adaptiveThreshold(normalized,255,cv2.ADAPTIVE_THRESH_MEAN_C,cv2.THRESH_BINARY,blockSize,2)
 		#invert it such that the object in white is now the lines
-		threshold=cv2.bitwise_not(threshold)
+		threshold=cv2.bitwise_not(threshold,dst=threshold)
 
 		if((threshold==0).all()):
-			threshold=cv2.adaptiveThreshold(blurred,255,cv2.ADAPTIVE_THRESH_MEAN_C,cv2.THRESH_BINARY_INV,11,2)
+			threshold=cv2.adaptiveThreshold(blurred,255,cv2.ADAPTIVE_THRESH_MEAN_C,cv2.THRESH_BINARY_INV,blockSize,2)
 
 		#self.display.displayImage(threshold)
 
@@ -74,13 +120,13 @@ class ExtractSudokuPuzzle:
 
 	This method find the largest contour in the preprocessedSudokuImage that has 4 points and return the contour
 	"""
-	def findLargestContour(self,preprocessedSudokuImage):
+	def findLargestContour(self,preprocessedSudokuImage,minArea=300):
 		# originalSudokuImage=deepcopy(originalSudokuImage)
 
 		#find contours in the binary image of sudokuImage and obtain the end points of them in a list (without hierarchical relationships)
 		contours,hierarchy=cv2.findContours(preprocessedSudokuImage,cv2.RETR_LIST,cv2.CHAIN_APPROX_SIMPLE)
+		self.profiler.count("contoursExamined",len(contours))
 		#the minimum area that is required in order to be considered as a potential contour for sudoku image is 300 (subject to change)
-		minArea=300
 		maxArea=0
 		largestContour=None
 		for contour in contours:
@@ -101,19 +147,19 @@ class ExtractSudokuPuzzle:
 		return largestContour,maxArea
 
 
-	def findSudokuPuzzleGrid(self,preprocessedSudokuImage,originalSudokuImage):
-		originalSudokuImage=deepcopy(originalSudokuImage)
-
+	def findSudokuPuzzleGrid(self,preprocessedSudokuImage,originalSudokuImage,minArea=300):
 		height,width=preprocessedSudokuImage.shape[:2]
 		sudokuImageArea=height*width
 
 
 		#Find largest conotur to find puzzle
-		largestContour,largestContourArea=self.findLargestContour(preprocessedSudokuImage)
+		with self.profiler.stage("findLargestContour"):
+			largestContour,largestContourArea=self.findLargestContour(preprocessedSudokuImage,minArea)
 
 
 		#Find largest feature to find puzzle
-		feature,cornerPoints,seed=Displayer.findLargestFeatureInImage(preprocessedSudokuImage)
+		with self.profiler.stage("findLargestFeatureInImage"):
+			feature,cornerPoints,seed=Displayer.findLargestFeatureInImage(preprocessedSudokuImage,featureImage=not self.copyFree)
 
 		#Needs to be converted to tuple to draw the rectangle box 
 		featureCornerPoints=cornerPoints.astype(int)
@@ -127,24 +173,30 @@ class ExtractSudokuPuzzle:
 			ratio=largestFeatureArea/largestContourArea
 		except(ZeroDivisionError):
 			if(largestFeatureArea==0):
-				print("Error in findSudokuPuzzleGrid: Unable to extract sudoku puzzle from image.")
-				exit()
+				raise SudokuImageError("Error in findSudokuPuzzleGrid: Unable to extract sudoku puzzle from image.")
 			else:	
 				ratio=0 
 
 		#We can't use just either largest feature or largest contour 
 		#because in some cases we can't expect to find the grid using just largest featur, we need the largest contour as well
 		#If ratio is 0, or any other number between 0.95 and 1.5 it use largest feature area
+		#The overlays are drawn on a copy only when the display sink shows or records them
 		if(ratio<0.95 or ratio>1.5):
-			cv2.line(originalSudokuImage,topLeft,topRight,(0,0,255),4)
-			cv2.line(originalSudokuImage,bottomLeft,bottomRight,(0,0,255),4)
-			cv2.line(originalSudokuImage,topLeft,bottomLeft,(0,0, 255),4)
-			cv2.line(originalSudokuImage,topRight,bottomRight,(0,0, 255),4)
-			self.display.displayImage(originalSudokuImage)
-			return cornerPoints
+			def drawFeature():
+				overlay=deepcopy(originalSudokuImage)
+				cv2.line(overlay,topLeft,topRight,(0,0,255),4)
+				cv2.line(overlay,bottomLeft,bottomRight,(0,0,255),4)
+				cv2.line(overlay,topLeft,bottomLeft,(0,0, 255),4)
+				cv2.line(overlay,topRight,bottomRight,(0,0, 255),4)
+				return overlay
+			self.display.displayImage(drawFeature)
+			return originalSudokuImage,cornerPoints
 		else: #else use largest contour
-			cv2.drawContours(originalSudokuImage,[largestContour],-1,(0,0, 255),4)
-			self.display.displayImage(originalSudokuImage)
+			def drawContour():
+				overlay=deepcopy(originalSudokuImage)
+				cv2.drawContours(overlay,[largestContour],-1,(0,0, 255),4)
+				return overlay
+			self.display.displayImage(drawContour)
 			return originalSudokuImage,self.getQuadrangleVertices(largestContour)
 
 
@@ -183,6 +235,18 @@ class ExtractSudokuPuzzle:
 
 		return quadrangle
 
+	"""
+	Refine corners found on a pyramid level (already scaled to full resolution) with sub-pixel corner refinement in a window
+	around every corner of the full resolution image, a corner which moves further than the uncertainty of the pyramid level is kept
+	"""
+	def refineQuadrangle(self,grayscale,quadrangle,scale):
+		halfWindow=2*scale+1
+		criteria=(cv2.TERM_CRITERIA_EPS+cv2.TERM_CRITERIA_COUNT,30,0.01)
+		refined=cv2.cornerSubPix(grayscale,quadrangle.reshape(4,1,2).copy(),(halfWindow,halfWindow),(-1,-1),criteria).reshape(4,2)
+		moved=np.linalg.norm(refined-quadrangle,axis=1)>2*scale
+		refined[moved]=quadrangle[moved]
+		return refined
+
 	"""
 	Returns the maximum width and height of the image
 	"""
@@ -207,26 +271,52 @@ class ExtractSudokuPuzzle:
 	Reference to https://docs.opencv.org/3.0-beta/doc/py_tutorials/py_imgproc/py_geometric_transformations/py_geometric_transformations.html (OpenCV tutorial)
 	"""
 	def extractSudokuPuzzleAndWarpPerspective(self,quadrangle,maximumWidth,maximumHeight,originalSudokuImage):
-		originalSudokuImage=deepcopy(originalSudokuImage)
-		
+		#warpPerspective writes to a new image, the original image is only read
 		#map the screen to a top down view
 		destinationPoints=np.array([ [0,0],[maximumWidth-1,0],[maximumWidth-1,maximumHeight-1],[0,maximumHeight-1] ],dtype="float32")
 		#Compute perspective transform
 		M=cv2.getPerspectiveTransform(quadrangle,destinationPoints)
+		self.perspectiveTransform=M
+		self.warpedSize=(maximumWidth,maximumHeight)
 		#Apply transformation                           
 		warp=cv2.warpPerspective(originalSudokuImage,M,(maximumWidth,maximumHeight))
 
 		return warp
 
+	"""
+	Warp another image of the same scene with the stored perspective transform and post process it
+	Used for video frames while the board stays still, so neither the grid search nor the transform is recomputed
+	"""
+	def rewarp(self,sudokuImage):
+		warp=cv2.warpPerspective(sudokuImage,self.perspectiveTransform,self.warpedSize)
+		if(self.copyFree):
+			self.preprocessedExtracted,self.postProcessedExtracted=self.resizeAndPostProcessSudokuPuzzle(warp)
+		else:
+			self.postProcessedExtracted=self.postProcessExtractedSudokuPuzzle(warp)
+		return self.postProcessedExtracted
+
 		#Convert the warped image to grayscale and rescale the intensity
 	def postProcessExtractedSudokuPuzzle(self,warpedSudokuPuzzle,postProcess=True):
 		if(postProcess):
 			#Convert warped image to grayscale
 			postProcessed= cv2.cvtColor(warpedSudokuPuzzle, cv2.COLOR_BGR2GRAY)
-			#Adjust intensity of pixels to have min and max value of 0 and 255
-			postProcessed=exposure.rescale_intensity(postProcessed,out_range=(0,255))
+			#Adjust intensity of pixels to have min and max value of 0 and 255, skimage is only imported by this legacy path
+			from skimage import exposure
+			postProcessed=exposure.rescale_intensity(postProcessed,out_range=(0,255)).astype(np.uint8)
 			postProcessed = cv2.resize(postProcessed,(450, 450),interpolation=cv2.INTER_AREA)
 			self.display.displayImage(postProcessed)
 		else:
 			postProcessed = cv2.resize(warpedSudokuPuzzle,(450, 450),interpolation=cv2.INTER_AREA)
 		return postProcessed
+
+	"""
+	Resize the warped puzzle once and derive the post processed puzzle from the resized one
+	The intensity is rescaled on the small 8 bit image with cv2.normalize instead of on the full warp in floating point
+	Returns the resized puzzle and the post processed puzzle
+	"""
+	def resizeAndPostProcessSudokuPuzzle(self,warpedSudokuPuzzle):
+		resized=cv2.resize(warpedSudokuPuzzle,(450, 450),interpolation=cv2.INTER_AREA)
+		postProcessed=cv2.cvtColor(resized,cv2.COLOR_BGR2GRAY)
+		cv2.normalize(postProcessed,postProcessed,0,255,cv2.NORM_MINMAX)
+		self.display.displayImage(postProcessed)
+		return resized,postProcessed
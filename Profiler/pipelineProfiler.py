@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+"""
+Instrumentation of the image pipeline
+Every stage runs inside profiler.stage(name), which adds its wall and CPU time, and reports item counts with profiler.count(name, n)
+The stages get NULL_PROFILER when nothing is measured, its methods do nothing, so the hooks cost a no-op call each
+With cProfile enabled the functions taking the most time are added to the result of every image
+"""
+
+import cProfile
+import io
+import pstats
+import time
+import numpy as np
+
+#Percentiles reported over a batch
+PERCENTILES=(50,90,99)
+
+
+class StageTimer:
+	def __init__(self,profiler,name):
+		self.profiler=profiler
+		self.name=name
+
+	def __enter__(self):
+		self.wallStart=time.perf_counter()
+		self.cpuStart=time.process_time()
+		return self
+
+	def __exit__(self,excType,excValue,traceback):
+		stage=self.profiler.stages.setdefault(self.name,{"wall":0.0,"cpu":0.0,"calls":0})
+		stage["wall"]+=time.perf_counter()-self.wallStart
+		stage["cpu"]+=time.process_time()-self.cpuStart
+		stage["calls"]+=1
+		return False
+
+
+class PipelineProfiler:
+	enabled=True
+
+	def __init__(self,cprofile=False,topFunctions=20):
+		self.cprofile=cprofile
+		self.topFunctions=topFunctions
+		self.reset()
+
+	def reset(self):
+		#stage name -> {"wall": seconds, "cpu": seconds, "calls": number}
+		self.stages={}
+		#counter name -> number
+		self.counts={}
+		self.profile=cProfile.Profile() if self.cprofile else None
+
+	def stage(self,name):
+		return StageTimer(self,name)
+
+	def count(self,name,number=1):
+		self.counts[name]=self.counts.get(name,0)+number
+
+	"""
+	Start and stop cProfile around the processing of one image
+	"""
+	def start(self):
+		if(self.profile is not None):
+			self.profile.enable()
+
+	def stop(self):
+		if(self.profile is not None):
+			self.profile.disable()
+
+	"""
+	The functions with the largest cumulative time as a list of dicts
+	"""
+	def profileFunctions(self):
+		if(self.profile is None):
+			return None
+		statistics=pstats.Stats(self.profile,stream=io.StringIO())
+		functions=[]
+		for (filename,line,function),(primitiveCalls,calls,totalTime,cumulativeTime,callers) in statistics.stats.items():
+			functions.append({"function":"%s:%d(%s)"%(filename,line,function),"calls":calls,"totalTime":totalTime,"cumulativeTime":cumulativeTime})
+		functions.sort(key=lambda function: function["cumulativeTime"],reverse=True)
+		return functions[:self.topFunctions]
+
+	def toDict(self):
+		result={"stages":self.stages,"counts":self.counts}
+		if(self.profile is not None):
+			result["profile"]=self.profileFunctions()
+		return result
+
+
+class NullStageTimer:
+	def __enter__(self):
+		return self
+
+	def __exit__(self,excType,excValue,traceback):
+		return False
+
+
+class NullProfiler:
+	enabled=False
+	timer=NullStageTimer()
+
+	def reset(self):
+		pass
+
+	def stage(self,name):
+		return self.timer
+
+	def count(self,name,number=1):
+		pass
+
+	def start(self):
+		pass
+
+	def stop(self):
+		pass
+
+	def toDict(self):
+		return None
+
+NULL_PROFILER=NullProfiler()
+
+
+"""
+Percentiles of the wall and CPU time of every stage and of every count over the profiles of a batch (dicts from toDict)
+"""
+def aggregateProfiles(profiles):
+	profiles=[profile for profile in profiles if profile is not None]
+	def summarize(values):
+		values=np.asarray(values,dtype=float)
+		summary={"p%d"%percentile:float(np.percentile(values,percentile)) for percentile in PERCENTILES}
+		summary["mean"]=float(values.mean())
+		summary["max"]=float(values.max())
+		return summary
+
+	stages={}
+	for name in sorted({name for profile in profiles for name in profile["stages"]}):
+		#images which never reached a stage are left out of its percentiles
+		measured=[profile["stages"][name] for profile in profiles if name in profile["stages"]]
+		stages[name]={"images":len(measured),"wall":summarize([stage["wall"] for stage in measured]),"cpu":summarize([stage["cpu"] for stage in measured])}
+
+	counts={}
+	for name in sorted({name for profile in profiles for name in profile["counts"]}):
+		counts[name]=summarize([profile["counts"].get(name,0) for profile in profiles])
+	return {"images":len(profiles),"stages":stages,"counts":counts}
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+"""
+In-process digit classifier used in place of tesseract
+Every crop is normalized to a 28x28 image with the digit centered in a 20x20 box (like MNIST) and compared with
+templates rendered from fonts available on this machine, so no download or training data is needed
+Requires Python 3, OpenCV, NumPy (and Pillow to render TrueType fonts, otherwise only the fonts built into OpenCV are used)
+"""
+
+import os
+import cv2
+import numpy as np
+
+DIGITS="123456789"
+IMAGE_SIZE=28
+DIGIT_BOX=20
+
+#Fonts shipped with OpenCV which are used to render training glyphs
+HERSHEY_FONTS=[cv2.FONT_HERSHEY_SIMPLEX,cv2.FONT_HERSHEY_DUPLEX,cv2.FONT_HERSHEY_COMPLEX,cv2.FONT_HERSHEY_TRIPLEX,cv2.FONT_HERSHEY_PLAIN]
+
+#Directories searched for TrueType and OpenType fonts
+FONT_DIRECTORIES=["/usr/share/fonts","/usr/local/share/fonts",os.path.expanduser("~/.fonts"),os.path.expanduser("~/.local/share/fonts"),"/Library/Fonts","/System/Library/Fonts","C:\\Windows\\Fonts"]
+MAXIMUM_FONTS=24
+
+#Gaussian kernel used to blur the normalized images before comparing them, so small offsets of strokes still match
+BLUR_KERNEL=cv2.getGaussianKernel(5,0).ravel().astype(np.float32)
+
+
+"""
+Convert a crop of a dark digit on light background to a 28x28 float image of a white digit on black background
+1. Threshold with Otsu to separate ink from paper
+2. Crop to the bounding box of the ink
+3. Scale the longest side to 20 pixels without distortion and center it in a 28x28 image
+"""
+def normalizeDigitImage(image):
+	if(image.ndim==3):
+		image=cv2.cvtColor(image,cv2.COLOR_BGR2GRAY)
+	normalized=np.zeros((IMAGE_SIZE,IMAGE_SIZE),dtype=np.float32)
+	if(image.size==0):
+		return normalized
+
+	ret,ink=cv2.threshold(image,0,255,cv2.THRESH_BINARY_INV+cv2.THRESH_OTSU)
+	points=cv2.findNonZero(ink)
+	if(points is None):
+		return normalized
+	x,y,w,h=cv2.boundingRect(points)
+	ink=ink[y:y+h,x:x+w]
+
+	scale=DIGIT_BOX/float(max(w,h))
+	width=max(1,int(round(w*scale))); height=max(1,int(round(h*scale)))
+	ink=cv2.resize(ink,(width,height),interpolation=cv2.INTER_AREA)
+
+	top=(IMAGE_SIZE-height)//2; left=(IMAGE_SIZE-width)//2
+	normalized[top:top+height,left:left+width]=ink/255.0
+	return normalized
+
+"""
+Blur a stack of normalized images (N, 28, 28) and scale every one to unit length, the dot product of two features is their cosine similarity
+"""
+def digitFeatures(normalizedImages):
+	images=np.asarray(normalizedImages,dtype=np.float32).reshape(-1,IMAGE_SIZE,IMAGE_SIZE)
+	radius=len(BLUR_KERNEL)//2
+	padded=np.pad(images,((0,0),(radius,radius),(radius,radius)))
+	blurred=sum(weight*padded[:,i:i+IMAGE_SIZE,:] for i,weight in enumerate(BLUR_KERNEL))
+	blurred=sum(weight*blurred[:,:,i:i+IMAGE_SIZE] for i,weight in enumerate(BLUR_KERNEL))
+	features=blurred.reshape(len(images),-1)
+	return features/np.maximum(np.linalg.norm(features,axis=1,keepdims=True),1e-6)
+
+"""
+Return the paths of up to MAXIMUM_FONTS TrueType/OpenType fonts installed on this machine
+"""
+def findLocalFonts(directories=FONT_DIRECTORIES):
+	fonts=[]
+	for directory in directories:
+		for root,dirs,files in os.walk(directory):
+			for name in sorted(files):
+				if(name.lower().endswith((".ttf",".otf"))):
+					fonts.append(os.path.join(root,name))
+	return sorted(fonts)[:MAXIMUM_FONTS]
+
+"""
+Render every digit in every font with several sizes and slants (and stroke thicknesses for the OpenCV fonts)
+Returns the rendered images (dark digit on light background, like a crop from the puzzle) and their digits
+"""
+def renderTrainingGlyphs(fontPaths=None,hersheyFonts=HERSHEY_FONTS,thicknesses=(1,2),scales=(1.5,2.0),slants=(-0.1,0.0,0.1)):
+	images=[]
+	labels=[]
+	for digit in DIGITS:
+		for font in hersheyFonts:
+			for thickness in thicknesses:
+				for scale in scales:
+					canvas=np.full((80,80),255,dtype=np.uint8)
+					(w,h),baseline=cv2.getTextSize(digit,font,scale,thickness)
+					cv2.putText(canvas,digit,((80-w)//2,(80+h)//2),font,scale,0,thickness,cv2.LINE_AA)
+					for slant in slants:
+						#shear the glyph to imitate italic and slightly tilted prints
+						shear=np.float32([[1,slant,-slant*40],[0,1,0]])
+						glyph=cv2.warpAffine(canvas,shear,(80,80),borderValue=255)
+						images.append(cv2.GaussianBlur(glyph,(5,5),0))
+						labels.append(digit)
+
+	if(fontPaths is None):
+		fontPaths=findLocalFonts()
+	if(len(fontPaths)>0):
+		try:
+			from PIL import Image, ImageDraw, ImageFont
+		except ImportError:
+			return images,labels
+		for fontPath in fontPaths:
+			for size in (40,56):
+				try:
+					font=ImageFont.truetype(fontPath,size)
+				except OSError:
+					continue
+				for digit in DIGITS:
+					canvas=Image.new("L",(80,80),255)
+					ImageDraw.Draw(canvas).text((40,40),digit,fill=0,font=font,anchor="mm")
+					canvas=np.array(canvas)
+					for slant in slants:
+						shear=np.float32([[1,slant,-slant*40],[0,1,0]])
+						glyph=cv2.warpAffine(canvas,shear,(80,80),borderValue=255)
+						images.append(cv2.GaussianBlur(glyph,(5,5),0))
+						labels.append(digit)
+	return images,labels
+
+
+class DigitClassifier:
+	templates=None
+	labels=None
+
+	def __init__(self,k=1,templates=None,labels=None,fontPaths=None):
+		self.k=k
+		if(templates is None):
+			glyphs,labels=renderTrainingGlyphs(fontPaths)
+			templates=np.stack([normalizeDigitImage(glyph) for glyph in glyphs])
+		self.templates=np.asarray(templates,dtype=np.float32).reshape(len(templates),-1)
+		self.labels=np.array(list(labels))
+		self.templateFeatures=digitFeatures(self.templates)
+
+	"""
+	Classify all normalized crops in one vectorized call: the cosine similarity of every crop to every template
+	is a single matrix product, the k most similar templates vote for the digit
+	"""
+	def classify(self,normalizedImages):
+		if(len(normalizedImages)==0):
+			return []
+		similarity=digitFeatures(normalizedImages)@self.templateFeatures.T
+		k=min(self.k,len(self.templateFeatures))
+		nearest=np.argpartition(-similarity,k-1,axis=1)[:,:k]
+		digitIndex=np.searchsorted(np.array(list(DIGITS)),self.labels[nearest])
+		#votes are weighted by similarity, so closer templates break ties between equal vote counts
+		votes=np.zeros((len(similarity),len(DIGITS)),dtype=np.float32)
+		np.add.at(votes,(np.arange(len(similarity))[:,None],digitIndex),1.0+np.take_along_axis(similarity,nearest,axis=1))
+		return [DIGITS[i] for i in votes.argmax(axis=1)]
+
+	"""
+	Recognizer interface used by SudokuSolver: takes the cropped digit images and returns their digits as strings
+	"""
+	def recognizeDigits(self,digitImages):
+		return self.classify([normalizeDigitImage(digitImage) for digitImage in digitImages])
+
+	def save(self,path):
+		np.savez_compressed(path,templates=self.templates,labels=self.labels,k=self.k)
+
+	@classmethod
+	def load(cls,path):
+		data=np.load(path)
+		return cls(k=int(data["k"]),templates=data["templates"],labels=data["labels"])
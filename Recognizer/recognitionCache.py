@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+"""
+Cache in front of digit recognition
+Every crop is normalized like for the classifier, blurred and reduced to a 16x16 average hash, so crops of the same printed digit
+from different scans share one key and the digit of that key is only recognized once
+The digits are kept in a bounded LRU cache which can be persisted as a JSON file
+A cache belongs to one recognizer, tesseract and the classifier should not share a file
+"""
+
+import json
+import os
+from collections import OrderedDict
+import cv2
+import numpy as np
+from Recognizer.digitClassifier import normalizeDigitImage
+
+#Coarser hashes give more hits but let similar digits like 3, 6, 8 and 9 share a key
+HASH_SIZE=16
+
+
+"""
+Perceptual hash of a digit crop: one bit for every cell of a 16x16 grid over the normalized, blurred digit, set where it is brighter than the mean
+Returned as a hexadecimal string so it can be stored in JSON
+"""
+def digitHash(digitImage):
+	normalized=cv2.GaussianBlur(normalizeDigitImage(digitImage),(5,5),0)
+	small=cv2.resize(normalized,(HASH_SIZE,HASH_SIZE),interpolation=cv2.INTER_AREA)
+	bits=np.packbits((small>small.mean()).ravel())
+	return bits.tobytes().hex()
+
+
+class RecognitionCache:
+	hits=0
+	misses=0
+
+	def __init__(self,maxsize=4096,path=None,trackNewEntries=False):
+		self.maxsize=maxsize
+		self.path=path
+		#hash -> recognized digit string
+		self.digits=OrderedDict()
+		#entries recognized since the last call of takeNewEntries, only kept if asked for
+		self.newEntries=[] if trackNewEntries else None
+		if(path is not None and os.path.exists(path)):
+			self.load(path)
+
+	"""
+	Return the digits of all crops, recognize(crops) is called once with the crops whose hash is not cached
+	Crops with equal hashes in one call are recognized once and count as hits after the first
+	"""
+	def recognizeDigits(self,digitImages,recognize):
+		keys=[digitHash(digitImage) for digitImage in digitImages]
+		#digits are collected per call, so storing new ones cannot evict a digit needed for the result
+		found={}
+		missing={}
+		for key,digitImage in zip(keys,digitImages):
+			if(key in self.digits):
+				self.hits+=1
+				self.digits.move_to_end(key)
+				found[key]=self.digits[key]
+			elif(key in found or key in missing):
+				self.hits+=1
+			else:
+				self.misses+=1
+				missing[key]=digitImage
+
+		if(len(missing)>0):
+			recognized=list(zip(missing,recognize(list(missing.values()))))
+			for key,digit in recognized:
+				self.store(key,digit)
+				found[key]=digit
+			if(self.newEntries is not None):
+				self.newEntries.extend(recognized)
+		return [found[key] for key in keys]
+
+	"""
+	Store a digit and evict the least recently used ones
+	"""
+	def store(self,key,digit):
+		self.digits[key]=digit
+		self.digits.move_to_end(key)
+		while(len(self.digits)>self.maxsize):
+			self.digits.popitem(last=False)
+
+	"""
+	Return and forget the entries stored since the last call, used to merge the caches of worker processes
+	"""
+	def takeNewEntries(self):
+		newEntries=self.newEntries or []
+		if(self.newEntries is not None):
+			self.newEntries=[]
+		return newEntries
+
+	def stats(self):
+		return {"hits":self.hits,"misses":self.misses,"size":len(self.digits),"maxsize":self.maxsize}
+
+	"""
+	Write the cached digits to a JSON file, least recently used first
+	"""
+	def save(self,path=None):
+		path=path or self.path
+		if(path is None):
+			raise ValueError("Error in RecognitionCache: no path given to save the cache to")
+		tmpPath=path+".tmp"
+		with open(tmpPath,"w") as f:
+			json.dump(list(self.digits.items()),f)
+		os.replace(tmpPath,path)
+
+	def load(self,path):
+		with open(path) as f:
+			for key,digit in json.load(f):
+				self.store(key,digit)
@@ -7,39 +7,123 @@ Requires Python 3, OpenCV (for image processing), TensorFlow (for building Convo
 USAGE: python3 sudokuImageSolver.py to launch in GUI and python3 sudokuImageSolver_console.py to launch in console
 """
 
+import os
 import cv2
+import numpy as np
 import Displayer.displayer as Displayer
+from Sudoku.sudokuImageError import SudokuImageError
+from Profiler.pipelineProfiler import NULL_PROFILER
+
+#Decode flags which let the JPEG decoder scale the image down by 8, 4 or 2 while decoding, largest reduction first
+REDUCED_DECODE_FLAGS=((8,cv2.IMREAD_REDUCED_COLOR_8),(4,cv2.IMREAD_REDUCED_COLOR_4),(2,cv2.IMREAD_REDUCED_COLOR_2))
+
+#JPEG markers which start a frame and hold the size of the image (all SOF markers except DHT, JPG and DAC)
+JPEG_FRAME_MARKERS=set(range(0xC0,0xD0))-{0xC4,0xC8,0xCC}
+
+#Buffers which hold an encoded image and are decoded as they are
+ENCODED_IMAGE_TYPES=(bytes,bytearray,memoryview,np.ndarray)
+
+
+"""
+Read width and height from the header of an encoded JPEG or PNG image without decoding it
+Returns None for other formats or damaged headers
+"""
+def readImageSize(data):
+	data=memoryview(data).cast("B")
+	if(data[:8].tobytes()==b"\x89PNG\r\n\x1a\n" and data[12:16].tobytes()==b"IHDR"):
+		return int.from_bytes(data[16:20],"big"),int.from_bytes(data[20:24],"big")
+	if(data[:2].tobytes()!=b"\xff\xd8"):
+		return None
+	#walk the segments of the JPEG until the frame header
+	position=2
+	while(position+4<=len(data)):
+		if(data[position]!=0xFF):
+			return None
+		marker=data[position+1]
+		if(marker==0xFF):
+			position+=1
+			continue
+		length=int.from_bytes(data[position+2:position+4],"big")
+		if(marker in JPEG_FRAME_MARKERS):
+			if(position+9>len(data)):
+				return None
+			return int.from_bytes(data[position+7:position+9],"big"),int.from_bytes(data[position+5:position+7],"big")
+		position+=2+length
+	return None
 
 class ResizeSudokuImage:
 	sudokuImage=None
 	imageHeight=None
 	imageWidth=None
 
-	def __init__(self,filename,MAXIMUM_WIDTH,MAXIMUM_HEIGHT,display):
-		self.sudokuImage=self.loadSudokuImage(filename)
+	"""
+	filename can be a path (str or os.PathLike), the encoded bytes of an image (bytes, bytearray, memoryview, a 1-D uint8 array
+	or a file object) or an already decoded image, anything else raises TypeError
+	"""
+	def __init__(self,filename,MAXIMUM_WIDTH,MAXIMUM_HEIGHT,display,profiler=NULL_PROFILER):
+		with profiler.stage("load"):
+			self.sudokuImage=self.loadSudokuImage(filename,MAXIMUM_WIDTH,MAXIMUM_HEIGHT)
 
 		self.imageHeight, self.imageWidth = self.sudokuImage.shape[:2]
-		
-		if(self.imageWidth>MAXIMUM_WIDTH):
-			self.sudokuImage=self.resizeImage(self.sudokuImage,intendedWidth=MAXIMUM_WIDTH)
 
-		self.imageHeight, self.imageWidth = self.sudokuImage.shape[:2]
-		if(self.imageHeight>MAXIMUM_HEIGHT):
-			self.sudokuImage=self.resizeImage(self.sudokuImage,intendedHeight=MAXIMUM_HEIGHT)
+		#resize once along the side which is furthest over its maximum
+		if(self.imageWidth>MAXIMUM_WIDTH or self.imageHeight>MAXIMUM_HEIGHT):
+			with profiler.stage("resize"):
+				if(self.imageWidth*MAXIMUM_HEIGHT>=self.imageHeight*MAXIMUM_WIDTH):
+					self.sudokuImage=self.resizeImage(self.sudokuImage,intendedWidth=MAXIMUM_WIDTH)
+				else:
+					self.sudokuImage=self.resizeImage(self.sudokuImage,intendedHeight=MAXIMUM_HEIGHT)
+			self.imageHeight, self.imageWidth = self.sudokuImage.shape[:2]
 
 		display.displayImage(self.sudokuImage)
 
 
-	def loadSudokuImage(self,filename):
-		#read in image in grayscale
-		sudokuImage=cv2.imread(filename,cv2.IMREAD_COLOR)
-		# sudokuImage=cv2.resize(sudokuImage,(900,900),interpolation=cv2.INTER_AREA)
+	"""
+	Decode the image, if its header shows it is at least twice as large as needed for the maximum size it is decoded at a reduced size
+	"""
+	def loadSudokuImage(self,filename,maximumWidth=None,maximumHeight=None):
+		#frames of a video are already decoded
+		if(isinstance(filename,np.ndarray) and filename.ndim>1):
+			return filename
+
+		if(isinstance(filename,os.PathLike)):
+			filename=os.fsdecode(filename)
+		if(isinstance(filename,str)):
+			#a missing or unreadable file is reported like an image which cannot be decoded
+			try:
+				data=np.fromfile(filename,dtype=np.uint8)
+			except OSError:
+				data=np.empty(0,dtype=np.uint8)
+		else:
+			if(not isinstance(filename,ENCODED_IMAGE_TYPES) and hasattr(filename,"read")):
+				filename=filename.read()
+			if(not isinstance(filename,ENCODED_IMAGE_TYPES)):
+				raise TypeError("A sudoku image is a path, encoded image bytes, a binary file object or a decoded image, not "+type(filename).__name__)
+			data=np.frombuffer(filename,dtype=np.uint8)
+
+		sudokuImage=None
+		if(data.size>0):
+			sudokuImage=cv2.imdecode(data,self.chooseDecodeFlag(data,maximumWidth,maximumHeight))
 		if(sudokuImage is None):
-			print("Error: Sudoku image cannot be read. Please check the filename and ensure that the image is in the correct path before trying again.")
-			exit()
+			raise SudokuImageError("Error: Sudoku image cannot be read. Please check the filename and ensure that the image is in the correct path before trying again.")
 
 		return sudokuImage
 
+	"""
+	Pick the largest reduced decode which still leaves the image at least as large as the resize would make it
+	The sides are checked both ways round, because the decoder may rotate the image according to its EXIF orientation
+	"""
+	def chooseDecodeFlag(self,data,maximumWidth,maximumHeight):
+		size=readImageSize(data) if maximumWidth is not None and maximumHeight is not None else None
+		if(size is None or min(size)==0):
+			return cv2.IMREAD_COLOR
+		width,height=size
+		ratio=max(min(maximumWidth/width,maximumHeight/height),min(maximumWidth/height,maximumHeight/width))
+		for factor,flag in REDUCED_DECODE_FLAGS:
+			if(factor*ratio<=1):
+				return flag
+		return cv2.IMREAD_COLOR
+
 	"""
 	Resize image without distortion
 	Reference to https://stackoverflow.com/questions/44650888/resize-an-image-without-distortion-opencv
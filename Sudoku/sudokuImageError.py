@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+
+"""
+Error raised by the stages of the image pipeline when a sudoku image cannot be processed
+Callers decide whether to stop (sudokuImageSolver.py) or record the error and continue (sudokuImageBatchSolver.py)
+"""
+
+class SudokuImageError(Exception):
+	#the detected sudoku string if digits were already recognized when the error was raised
+	grid=None
+
+	def __init__(self,message,grid=None):
+		super().__init__(message)
+		self.grid=grid
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+"""
+Batch solver for many sudoku strings at once.
+Candidates of all puzzles are kept in a boolean tensor of shape (N, 81, 9) and naked and hidden singles
+are applied to every puzzle at the same time with NumPy array operations.
+Only the puzzles that are still unsolved afterwards are passed on to the search of the bitmask backend.
+"""
+
+import numpy as np
+import Sudoku_Solver.bitmask_solver as bitmask_solver
+
+# Index tables of rows, columns and blocks, every table holds each cell exactly once
+unit_tables = (
+    np.array(bitmask_solver.unit_rows),
+    np.array(bitmask_solver.unit_columns),
+    np.array(bitmask_solver.unit_blocks),
+)
+
+# peer_matrix[i, j] is 1 if cell j is a peer of cell i
+peer_matrix = np.zeros((81, 81), dtype=np.float32)
+for index, cell_peers in enumerate(bitmask_solver.peers):
+    peer_matrix[index, list(cell_peers)] = 1
+
+# Value of every digit in the bitmask backend
+digit_bits = 1 << np.arange(9)
+
+# Number of puzzles propagated together, bounds the memory used by the tensors
+BATCH_SIZE = 4096
+
+
+# Create the candidate tensor from sudoku strings, where every character that is no digit is an empty cell
+def create_candidate_tensor(puzzle_strings):
+    for puzzle in puzzle_strings:
+        if len(puzzle) != 81:
+            raise ValueError("Sudoku string must have 81 characters: " + puzzle)
+    values = np.frombuffer("".join(puzzle_strings).encode("ascii", "replace"), dtype=np.uint8).reshape(-1, 81).astype(np.int16) - ord("1")
+    given = (values >= 0) & (values <= 8)
+    candidates = np.ones((len(puzzle_strings), 81, 9), dtype=bool)
+    candidates[given] = np.arange(9) == values[given][:, None]
+    return candidates
+
+# Apply naked and hidden singles until nothing changes
+# Returns a boolean array marking the puzzles in which a contradiction was found
+def propagate(candidates):
+    failed = np.zeros(len(candidates), dtype=bool)
+    active = np.arange(len(candidates))
+    while len(active):
+        current = candidates[active]
+        before = current.copy()
+
+        # naked singles: a solved cell removes its digit from all peers
+        counts = current.sum(axis=2)
+        solved = current & (counts == 1)[:, :, None]
+        current &= ~(np.matmul(peer_matrix, solved.astype(np.float32)) > 0)
+
+        # hidden singles: a digit with a single place in a unit has to go there
+        forced = np.zeros_like(current)
+        contradiction = np.zeros(len(active), dtype=bool)
+        for table in unit_tables:
+            unit_view = current[:, table]
+            places = unit_view.sum(axis=2)
+            contradiction |= (places == 0).any(axis=(1, 2))
+            forced[:, table.ravel()] |= (unit_view & (places == 1)[:, :, None, :]).reshape(-1, 81, 9)
+        forced_counts = forced.sum(axis=2)
+        contradiction |= (forced_counts > 1).any(axis=1)
+        current = np.where((forced_counts > 0)[:, :, None], current & forced, current)
+
+        contradiction |= (current.sum(axis=2) == 0).any(axis=1)
+        candidates[active] = current
+
+        changed = (current != before).any(axis=(1, 2)) & ~contradiction
+        failed[active[contradiction]] = True
+        active = active[changed]
+    return failed
+
+# Solve a batch of at most BATCH_SIZE sudoku strings
+def solve_chunk(puzzle_strings):
+    candidates = create_candidate_tensor(puzzle_strings)
+    failed = propagate(candidates)
+    masks = (candidates * digit_bits).sum(axis=2)
+    unsolved = (candidates.sum(axis=2) > 1).any(axis=1)
+
+    solutions = []
+    for index in range(len(puzzle_strings)):
+        if failed[index]:
+            solutions.append(False)
+            continue
+        solution = masks[index].tolist()
+        if unsolved[index]:
+            solution = bitmask_solver.search_iterative(solution)
+            if solution is False:
+                solutions.append(False)
+                continue
+        solutions.append(bitmask_solver.candidates_to_dict(solution))
+    return solutions
+
+# Solve many sudoku strings of 81 characters
+# Returns a list holding for every puzzle a dict with cellname as key and the solved number as value or False
+def solve_batch(puzzle_strings, batch_size=BATCH_SIZE):
+    puzzle_strings = list(puzzle_strings)
+    solutions = []
+    for start in range(0, len(puzzle_strings), batch_size):
+        solutions.extend(solve_chunk(puzzle_strings[start:start+batch_size]))
+    return solutions
@@ -0,0 +1,258 @@
+#!/usr/bin/python3
+"""
+Bitmask backend for the sudoku solver.
+Candidates of every cell are stored as a 9-bit integer (bit 0 = digit 1, bit 8 = digit 9)
+in a flat list of 81 slots, cell 0 = A1 and cell 80 = I9.
+Rows, columns, blocks and peers are precomputed tables of cell indices.
+"""
+
+import time
+
+digits = "123456789"
+rows = "ABCDEFGHI"
+columns = "123456789"
+
+# Mask with every digit still possible
+ALL_DIGITS = 0x1FF
+
+# Names of all cells in index order; 0 = A1; 80 = I9;
+cell_names = tuple(r+c for r in rows for c in columns)
+
+# Index tables of all rows, columns and blocks
+unit_rows = tuple(tuple(r*9+c for c in range(9)) for r in range(9))
+unit_columns = tuple(tuple(r*9+c for r in range(9)) for c in range(9))
+unit_blocks = tuple(tuple((br+r)*9+bc+c for r in range(3) for c in range(3)) for br in range(0,9,3) for bc in range(0,9,3))
+units = unit_rows + unit_columns + unit_blocks
+
+# The three units (row, column, block) every cell is in, looked up from the position of the cell
+cell_units = tuple((unit_rows[index//9], unit_columns[index%9], unit_blocks[index//27*3 + index%9//3]) for index in range(81))
+
+# The 20 cells sharing a row, column or block with every cell
+peers = tuple(tuple(sorted(set().union(*cell_units[index]) - {index})) for index in range(81))
+
+# Build the tables of all 512 masks in one pass, the entry of every mask extends the entry of the mask without its lowest bit
+def build_mask_tables():
+    bit_count, mask_digits, mask_bits = [0], [""], [()]
+    for mask in range(1, ALL_DIGITS+1):
+        lowest = mask & -mask
+        rest = mask ^ lowest
+        bit_count.append(bit_count[rest] + 1)
+        mask_digits.append(digits[lowest.bit_length()-1] + mask_digits[rest])
+        mask_bits.append((lowest,) + mask_bits[rest])
+    return tuple(bit_count), tuple(mask_digits), tuple(mask_bits)
+
+# Number of candidates in a mask
+# Digit characters still possible in a mask, in ascending order
+# Single digit masks contained in a mask, in ascending order
+bit_count, mask_digits, mask_bits = build_mask_tables()
+
+# Mask of a single digit character
+digit_masks = {d: 1 << i for i, d in enumerate(digits)}
+
+# The deadline is checked every time this many nodes were searched
+DEADLINE_CHECK_INTERVAL = 64
+
+
+class BudgetExceeded:
+    def __repr__(self):
+        return "BUDGET_EXCEEDED"
+
+# Returned by the search instead of a solution or False when its node budget or deadline runs out
+BUDGET_EXCEEDED = BudgetExceeded()
+
+
+# Remove the digits in mask from a cell and propagate the consequences
+# Every changed cell is recorded as (index, previous mask) on trail if one is given
+# Returns False if a contradiction is found
+def eliminate(candidates, index, mask, trail=None):
+    pending = [(index, mask)]
+    while pending:
+        index, mask = pending.pop()
+        current = candidates[index]
+        removed = current & mask
+        if not removed:
+            continue
+        remaining = current & ~mask
+        if not remaining:
+            return False
+        if trail is not None:
+            trail.append((index, current))
+        candidates[index] = remaining
+        # a cell with a single candidate left removes it from its peers
+        if bit_count[remaining] == 1:
+            for peer in peers[index]:
+                if candidates[peer] & remaining:
+                    pending.append((peer, remaining))
+        # a removed digit with a single place left in a unit has to go there
+        for unit in cell_units[index]:
+            for bit in mask_bits[removed]:
+                place = -1
+                for other in unit:
+                    if candidates[other] & bit:
+                        if place >= 0:
+                            break
+                        place = other
+                else:
+                    if place < 0:
+                        return False
+                    if candidates[place] != bit:
+                        pending.append((place, candidates[place] & ~bit))
+    return True
+
+# Set the cell to the digit mask by eliminating every other candidate
+def assign(candidates, index, mask, trail=None):
+    return eliminate(candidates, index, candidates[index] & ~mask, trail)
+
+# Revert every change recorded on trail after position mark
+def undo(candidates, trail, mark):
+    while len(trail) > mark:
+        index, mask = trail.pop()
+        candidates[index] = mask
+
+# assign which also records the propagation in a SolverStats object
+def timed_assign(candidates, index, mask, trail, stats):
+    before = len(trail) if trail is not None else 0
+    start = time.perf_counter()
+    consistent = assign(candidates, index, mask, trail)
+    stats.propagation_time += time.perf_counter()-start
+    stats.propagations += 1
+    if trail is not None:
+        stats.eliminations += len(trail)-before
+    if not consistent:
+        stats.contradictions += 1
+    return consistent
+
+# Create the candidate list from a sudoku string, where every character that is no digit is an empty cell
+# Returns False if the given digits contradict each other
+def parse_grid(grid, stats=None):
+    candidates = [ALL_DIGITS] * 81
+    for index in range(len(grid)):
+        mask = digit_masks.get(grid[index])
+        if mask is None:
+            continue
+        if stats is None:
+            consistent = assign(candidates, index, mask)
+        else:
+            consistent = timed_assign(candidates, index, mask, None, stats)
+        if not consistent:
+            return False
+    return candidates
+
+# Return the unsolved cell with the fewest candidates or -1 if every cell is solved
+def select_cell(candidates):
+    best = -1
+    best_count = 10
+    for index in range(81):
+        count = bit_count[candidates[index]]
+        if 1 < count < best_count:
+            best = index
+            best_count = count
+            if count == 2:
+                break
+    return best
+
+# Depth first search on copies of the candidate list
+def search(candidates):
+    if candidates is False:
+        return False
+    index = select_cell(candidates)
+    if index < 0:
+        return candidates
+    for bit in mask_bits[candidates[index]]:
+        branch = candidates[:]
+        if assign(branch, index, bit):
+            solution = search(branch)
+            if solution:
+                return solution
+    return False
+
+# Depth first search with an explicit stack, changing the candidate list in place
+# A failed branch is reverted with the undo trail instead of being copied, so memory
+# stays flat and the search depth is not limited by the recursion limit
+# Yields the candidate list every time all cells are solved, it is changed again when the search is resumed
+# The search stops and yields BUDGET_EXCEEDED once more than max_nodes branches were tried
+# or time.monotonic() has passed deadline
+# Nodes, depth, backtracks and propagations are counted in stats if a SolverStats object is given
+def iterate_solutions(candidates, max_nodes=None, deadline=None, stats=None):
+    if candidates is False:
+        return
+    index = select_cell(candidates)
+    if index < 0:
+        yield candidates
+        return
+    trail = []
+    # every frame holds the branching cell, its untried digits and the trail position before branching
+    stack = [[index, candidates[index], 0]]
+    if stats is not None and stats.max_depth < 1:
+        stats.max_depth = 1
+    nodes = 0
+    while stack:
+        frame = stack[-1]
+        index, untried, mark = frame
+        undo(candidates, trail, mark)
+        if not untried:
+            stack.pop()
+            if stats is not None:
+                stats.backtracks += 1
+            continue
+        nodes += 1
+        if max_nodes is not None and nodes > max_nodes:
+            yield BUDGET_EXCEEDED
+            return
+        if deadline is not None and nodes % DEADLINE_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+            yield BUDGET_EXCEEDED
+            return
+        bit = untried & -untried
+        frame[1] = untried & ~bit
+        if stats is None:
+            consistent = assign(candidates, index, bit, trail)
+        else:
+            stats.nodes += 1
+            consistent = timed_assign(candidates, index, bit, trail, stats)
+        if consistent:
+            index = select_cell(candidates)
+            if index < 0:
+                yield candidates
+                continue
+            stack.append([index, candidates[index], len(trail)])
+            if stats is not None and len(stack) > stats.max_depth:
+                stats.max_depth = len(stack)
+
+# Return the first solution of the iterative search, False or BUDGET_EXCEEDED
+def search_iterative(candidates, max_nodes=None, deadline=None, stats=None):
+    if stats is None:
+        for solution in iterate_solutions(candidates, max_nodes, deadline):
+            return solution
+        return False
+    start = time.perf_counter()
+    propagation_time = stats.propagation_time
+    solution = False
+    for solution in iterate_solutions(candidates, max_nodes, deadline, stats):
+        break
+    stats.branching_time += time.perf_counter()-start-(stats.propagation_time-propagation_time)
+    return solution
+
+# Count the solutions, stopping as soon as limit solutions are found
+def count_solutions(candidates, limit=None):
+    count = 0
+    for _ in iterate_solutions(candidates):
+        count += 1
+        if limit is not None and count >= limit:
+            break
+    return count
+
+# Search functions selectable by name
+search_modes = {
+    "copy": search,
+    "trail": search_iterative,
+}
+
+# Convert a candidate list to the dict with cellname as key and possible numbers as value
+def candidates_to_dict(candidates):
+    return {cell_names[index]: mask_digits[candidates[index]] for index in range(81)}
+
+# Solve given sudoku string and return the solved candidate list or False
+def solve(sudoku_string, mode="trail"):
+    if mode not in search_modes:
+        raise ValueError("Unknown search mode: " + str(mode))
+    return search_modes[mode](parse_grid(sudoku_string))
@@ -0,0 +1,172 @@
+#!/usr/bin/python3
+"""
+Dancing Links (Algorithm X) backend for the sudoku solver.
+A sudoku is an exact cover problem with 729 rows (every digit in every cell) and 324 columns
+(every cell filled, every digit once per row, column and block).
+The links are stored in flat lists of node indices, node 0 is the root and nodes 1-324 are the column headers.
+Reference to https://arxiv.org/abs/cs/0011047 (Donald Knuth, Dancing Links)
+"""
+
+digits = "123456789"
+rows = "ABCDEFGHI"
+columns = "123456789"
+
+# Names of all cells in index order; 0 = A1; 80 = I9;
+cell_names = tuple(r+c for r in rows for c in columns)
+
+COLUMN_COUNT = 324
+
+
+# Columns covered by placing digit d (0-8) into cell (0-80)
+def constraint_columns(cell, d):
+    row, col = divmod(cell, 9)
+    block = (row//3)*3 + col//3
+    return (1+cell, 82+row*9+d, 163+col*9+d, 244+block*9+d)
+
+# Build the links of the complete sudoku matrix once, every solve works on a copy
+def build_links():
+    left = [i-1 for i in range(COLUMN_COUNT+1)]
+    right = [i+1 for i in range(COLUMN_COUNT+1)]
+    left[0] = COLUMN_COUNT
+    right[COLUMN_COUNT] = 0
+    up = list(range(COLUMN_COUNT+1))
+    down = list(range(COLUMN_COUNT+1))
+    column = list(range(COLUMN_COUNT+1))
+    row_of = [-1] * (COLUMN_COUNT+1)
+    size = [0] * (COLUMN_COUNT+1)
+    first_node = []
+    for matrix_row in range(729):
+        first = len(column)
+        first_node.append(first)
+        for offset, c in enumerate(constraint_columns(matrix_row//9, matrix_row%9)):
+            node = first+offset
+            column.append(c)
+            row_of.append(matrix_row)
+            # append node at the bottom of column c
+            up.append(up[c])
+            down.append(c)
+            down[up[c]] = node
+            up[c] = node
+            size[c] += 1
+            # link the four nodes of the row in a circle
+            left.append(first+(offset-1)%4)
+            right.append(first+(offset+1)%4)
+    return left, right, up, down, column, row_of, size, tuple(first_node)
+
+links = build_links()
+
+
+class DancingLinks:
+    def __init__(self):
+        left, right, up, down, column, row_of, size, first_node = links
+        self.left = left[:]
+        self.right = right[:]
+        self.up = up[:]
+        self.down = down[:]
+        self.size = size[:]
+        self.column = column
+        self.row_of = row_of
+        self.first_node = first_node
+        self.solution = []
+
+    # Remove column c from the header list and every row of c from the other columns
+    def cover(self, c):
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                up[down[j]] = up[j]
+                down[up[j]] = down[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    # Undo cover(c) in exactly the reverse order
+    def uncover(self, c):
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                up[down[j]] = j
+                down[up[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
+
+    # Select a matrix row before searching, returns False if one of its columns is already covered
+    def select_row(self, matrix_row):
+        node = self.first_node[matrix_row]
+        j = node
+        while True:
+            c = self.column[j]
+            if self.right[self.left[c]] != c:
+                return False
+            j = self.right[j]
+            if j == node:
+                break
+        while True:
+            self.cover(self.column[j])
+            j = self.right[j]
+            if j == node:
+                break
+        self.solution.append(matrix_row)
+        return True
+
+    # Return the uncovered column with the fewest rows
+    def choose_column(self):
+        right, size = self.right, self.size
+        best = right[0]
+        best_size = size[best]
+        c = right[best]
+        while c != 0 and best_size > 1:
+            if size[c] < best_size:
+                best = c
+                best_size = size[c]
+            c = right[c]
+        return best
+
+    # Algorithm X, returns True as soon as every column is covered
+    def search(self):
+        right, left, down, column = self.right, self.left, self.down, self.column
+        if right[0] == 0:
+            return True
+        c = self.choose_column()
+        if self.size[c] == 0:
+            return False
+        self.cover(c)
+        r = down[c]
+        while r != c:
+            self.solution.append(self.row_of[r])
+            j = right[r]
+            while j != r:
+                self.cover(column[j])
+                j = right[j]
+            if self.search():
+                return True
+            self.solution.pop()
+            j = left[r]
+            while j != r:
+                self.uncover(column[j])
+                j = left[j]
+            r = down[r]
+        self.uncover(c)
+        return False
+
+
+# Solve given sudoku string, where every character that is no digit is an empty cell
+# Returns dict with cellname as key and the solved number as value or False
+def solve(sudoku_string):
+    matrix = DancingLinks()
+    for cell in range(len(sudoku_string)):
+        d = digits.find(sudoku_string[cell])
+        if d >= 0 and not matrix.select_row(cell*9+d):
+            return False
+    if not matrix.search():
+        return False
+    return {cell_names[matrix_row//9]: digits[matrix_row%9] for matrix_row in matrix.solution}
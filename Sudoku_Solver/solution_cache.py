@@ -0,0 +1,218 @@
+#!/usr/bin/python3
+"""
+Solution cache in front of solve_sudoku.
+Puzzles that are the same grid up to a symmetry (digit relabeling, swapping rows or columns within a band or stack,
+swapping bands or stacks, transposition) share one canonical form. The solution of the canonical form is stored in
+a bounded LRU cache and mapped back to the orientation of the puzzle that was asked for.
+An exact repeat of a puzzle is answered from a second LRU cache keyed by the puzzle string, before any canonical form
+is computed, so a repeat costs a dict lookup and only new puzzles pay for canonicalization.
+"""
+
+import json
+import os
+from collections import Counter, OrderedDict
+from itertools import groupby, permutations, product
+from math import factorial
+import Sudoku_Solver.sudoku_solver as ss
+
+digits = "123456789"
+
+# Puzzles needing more row and column orderings than this are not canonicalized, only their exact repeats are cached
+# Every ordering builds one candidate grid: 2 orderings (most puzzles) take about 0.3 ms and 16 about 0.4 ms,
+# while 512 took about 6 ms, several times the search they would save
+MAX_ORDERINGS = 16
+
+
+# Return every ordering of items that keeps them sorted by key, trying all permutations among equal keys
+def sorted_orderings(items, key):
+    groups = [tuple(group) for _, group in groupby(sorted(items, key=key), key)]
+    for choice in product(*(permutations(group) for group in groups)):
+        yield [item for group in choice for item in group]
+
+# Count the orderings sorted_orderings would return
+def count_orderings(items, key):
+    count = 1
+    for ties in Counter(map(key, items)).values():
+        count *= factorial(ties)
+    return count
+
+# Signatures of rows and columns which do not change under any of the symmetries except transposition
+def line_signatures(grid):
+    digit_count = {d: grid.count(d) for d in digits}
+    row_givens = [[c for c in range(9) if grid[r*9+c] in digits] for r in range(9)]
+    col_givens = [[r for r in range(9) if grid[r*9+c] in digits] for c in range(9)]
+
+    def basic(givens, value):
+        per_box = [0, 0, 0]
+        for g in givens:
+            per_box[g//3] += 1
+        return (len(givens), tuple(sorted(per_box)), tuple(sorted(digit_count[value(g)] for g in givens)))
+
+    basic_rows = [basic(row_givens[r], lambda c, r=r: grid[r*9+c]) for r in range(9)]
+    basic_cols = [basic(col_givens[c], lambda r, c=c: grid[r*9+c]) for c in range(9)]
+    row_signatures = [(basic_rows[r], tuple(sorted(basic_cols[c] for c in row_givens[r]))) for r in range(9)]
+    col_signatures = [(basic_cols[c], tuple(sorted(basic_rows[r] for r in col_givens[c]))) for c in range(9)]
+    return row_signatures, col_signatures
+
+# Count and generate the orderings of lines sorted by band signature and line signature
+def line_orderings(signatures):
+    bands = [tuple(range(b, b+3)) for b in range(0, 9, 3)]
+    # the key of a band is computed once, sorting and counting look it up many times
+    band_keys = {band: tuple(sorted(signatures[line] for line in band)) for band in bands}
+    band_key = band_keys.__getitem__
+    line_key = signatures.__getitem__
+    count = count_orderings(bands, band_key)
+    for band in bands:
+        count *= count_orderings(band, line_key)
+
+    def generate():
+        for band_order in sorted_orderings(bands, band_key):
+            for line_orders in product(*(list(sorted_orderings(band, line_key)) for band in band_order)):
+                yield [line for lines in line_orders for line in lines]
+    return count, generate
+
+# Transposed copy of a sudoku string
+def transpose(grid):
+    return "".join(grid[c*9+r] for r in range(9) for c in range(9))
+
+# Compute the canonical form of a sudoku string of 81 characters
+# Returns (canonical string, source index of every canonical cell, canonical label -> original digit)
+# or None if the puzzle has too many symmetric orderings to canonicalize cheaply
+def canonical_form(sudoku_string):
+    grid = "".join(ch if ch in digits else "0" for ch in sudoku_string)
+    # the rows of the transposed grid are the columns of the grid, so its orderings are the same ones swapped
+    row_signatures, col_signatures = line_signatures(grid)
+    row_count, row_orders = line_orderings(row_signatures)
+    col_count, col_orders = line_orderings(col_signatures)
+    if 2*row_count*col_count > MAX_ORDERINGS:
+        return None
+    orientations = [(False, grid, row_orders, col_orders), (True, transpose(grid), col_orders, row_orders)]
+
+    best = None
+    for transposed, oriented, row_orders, col_orders in orientations:
+        col_order_list = list(col_orders())
+        for row_order in row_orders():
+            for col_order in col_order_list:
+                labels = {}
+                out = []
+                for r in row_order:
+                    for c in col_order:
+                        value = oriented[r*9+c]
+                        if value != "0" and value not in labels:
+                            labels[value] = digits[len(labels)]
+                        out.append(labels.get(value, "0"))
+                candidate = "".join(out)
+                if best is None or candidate < best[0]:
+                    best = (candidate, transposed, row_order, col_order, labels)
+
+    canonical, transposed, row_order, col_order, labels = best
+    if transposed:
+        source = [c*9+r for r in row_order for c in col_order]
+    else:
+        source = [r*9+c for r in row_order for c in col_order]
+    # digits which are not given get the remaining labels in ascending order
+    for d in digits:
+        if d not in labels:
+            labels[d] = digits[len(labels)]
+    return canonical, source, {label: d for d, label in labels.items()}
+
+
+class SolutionCache:
+    def __init__(self, maxsize=10000, path=None, backend="bitmask"):
+        self.maxsize = maxsize
+        self.path = path
+        self.backend = backend
+        # hits counts both layers, exact_hits the puzzles found by their string, misses and uncached were searched
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self.uncached = 0
+        # canonical puzzle -> canonical solution string, or None if not solvable
+        self.solutions = OrderedDict()
+        # puzzle string with 0 for blanks -> solution string in its own orientation, or None if not solvable
+        self.exact = OrderedDict()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    # Solve given sudoku string through the cache, misses are solved with backend or the backend of the cache
+    # Returns dict with cellname as key and the solved number as value or False, like solve_sudoku
+    def solve_sudoku(self, sudoku_string, backend=None):
+        backend = backend or self.backend
+        if len(sudoku_string) != 81:
+            self.uncached += 1
+            return ss.solve_sudoku(sudoku_string, backend=backend)
+
+        key = sudoku_string.replace(".", "0")
+        if key in self.exact:
+            self.hits += 1
+            self.exact_hits += 1
+            self.exact.move_to_end(key)
+            solution = self.exact[key]
+        else:
+            solution = self.solve_canonical(sudoku_string, backend)
+            self.remember(self.exact, key, solution)
+
+        if solution is None:
+            return False
+        return dict(zip(ss.cells, solution))
+
+    # Solve a puzzle which is not in the exact cache through its canonical form
+    # Returns the solution string in the orientation of the puzzle or None if it is not solvable
+    def solve_canonical(self, sudoku_string, backend):
+        form = canonical_form(sudoku_string)
+        if form is None:
+            self.uncached += 1
+            solved = ss.solve_sudoku(sudoku_string, backend=backend)
+            return None if solved is False else ss.generate_string_from_sudoku(solved)
+
+        canonical, source, original_digits = form
+        if canonical in self.solutions:
+            self.hits += 1
+            self.solutions.move_to_end(canonical)
+            solution = self.solutions[canonical]
+        else:
+            self.misses += 1
+            solved = ss.solve_sudoku(canonical, backend=backend)
+            solution = None if solved is False else ss.generate_string_from_sudoku(solved)
+            self.store(canonical, solution)
+
+        if solution is None:
+            return None
+        # map the canonical solution back to the orientation of the puzzle
+        original = [None]*81
+        for index in range(81):
+            original[source[index]] = original_digits[solution[index]]
+        return "".join(original)
+
+    # Store a canonical solution and evict the least recently used ones
+    def store(self, canonical, solution):
+        self.remember(self.solutions, canonical, solution)
+
+    # Put a solution into one of the LRU caches and evict its least recently used entries
+    def remember(self, cache, key, solution):
+        cache[key] = solution
+        cache.move_to_end(key)
+        while len(cache) > self.maxsize:
+            cache.popitem(last=False)
+
+    # Return hit and miss counters
+    def stats(self):
+        return {"hits": self.hits, "exact_hits": self.exact_hits, "misses": self.misses, "uncached": self.uncached,
+                "size": len(self.solutions), "exact_size": len(self.exact), "maxsize": self.maxsize}
+
+    # Write the cached canonical solutions to a JSON file, least recently used first
+    # The exact cache is not written, it refills with one canonicalization per distinct puzzle
+    def save(self, path=None):
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path given to save the solution cache to")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(list(self.solutions.items()), f)
+        os.replace(tmp_path, path)
+
+    # Read cached solutions from a JSON file written by save
+    def load(self, path):
+        with open(path) as f:
+            for canonical, solution in json.load(f):
+                self.store(canonical, solution)
@@ -1,14 +1,34 @@
 #!/usr/bin/python3
 
-import imutils
 import cv2
-import pytesseract
-import sys
+import numpy as np
 import Sudoku_Solver.sudoku_solver as ss
+from Sudoku_Solver.solver_stats import SolverStats
+from Sudoku.sudokuImageError import SudokuImageError
+from Profiler.pipelineProfiler import NULL_PROFILER
+
+
+# tesseract settings for a single digit and for the tiled image of all digits of a puzzle
+OCR_CONFIG = "--oem 2 --psm 10"
+BATCH_OCR_CONFIG = "--oem 2 --psm 6 -c tessedit_char_whitelist=123456789"
+
+# fraction of a cell cut off on every side in fixed grid mode so grid lines do not count as ink
+CELL_MARGIN = 0.2
+# fraction of ink pixels above which a cell in fixed grid mode holds a digit
+INK_DENSITY_THRESHOLD = 0.03
 
 
 class SudokuSolver:
-    def __init__(self,imageToSolve,display):
+    def __init__(self,imageToSolve,display,batchOCR=False,recognizer=None,fixedGrid=False,recognitionCache=None,profiler=NULL_PROFILER):
+        # run tesseract once on a tiled image of all digits instead of once per digit
+        self.batchOCR = batchOCR
+        # object with a recognizeDigits(digitImages) method used instead of tesseract, e.g. Recognizer.digitClassifier.DigitClassifier
+        self.recognizer = recognizer
+        # Recognizer.recognitionCache.RecognitionCache in front of the recognizer, crops with a cached hash are not recognized again
+        self.recognitionCache = recognitionCache
+        # Profiler.pipelineProfiler.PipelineProfiler measuring the stages, findDigits includes recognizeDigits
+        self.profiler = profiler
+
         # compute size of single field of 9x9 array of image
         self.inner_rect_width = int(500/9)
 
@@ -17,29 +37,45 @@ class SudokuSolver:
 
         self.sudoku = {}
         self.original_positions = []
+        # detected and solved sudoku strings, set by printSolution
+        self.detected = None
+        self.solution = None
+        # the extracted puzzle is handed over in memory as a grayscale image, the solution is drawn in colour
+        if imageToSolve.ndim == 2:
+            imageToSolve = cv2.cvtColor(imageToSolve, cv2.COLOR_GRAY2BGR)
         self.image = imageToSolve
 
         self.display=display
 
-        # Check if sudoku is not fullscreen
-        tmp_image = imutils.resize(self.image, height=500)
+        # imutils and pytesseract take longer to import than the rest of the module, they are imported when their step runs
+        import imutils
+
+        if fixedGrid:
+            # the warped puzzle is a top down view, so every cell is one ninth of it and no contours are needed
+            self.original_image = imutils.resize(self.image, height=500)
+            with profiler.stage("findDigits"):
+                self.storeDigitsFromFixedGrid(self.image)
+        else:
+            # Check if sudoku is not fullscreen
+            tmp_image = imutils.resize(self.image, height=500)
 
 
-        contours, hierarchy = self.findContoursAndHierarchy(tmp_image);
-        #Find largest rect in image
-        self.findLargestRect(contours);
+            contours, hierarchy = self.findContoursAndHierarchy(tmp_image);
+            #Find largest rect in image
+            self.findLargestRect(tmp_image,contours);
 
-        # resize image to 500x500
-        resizedImage = imutils.resize(self.image, height=500)
+            # resize image to 500x500
+            resizedImage = imutils.resize(self.image, height=500)
 
-        #self.display.displayImage(resizedImage)
+            #self.display.displayImage(resizedImage)
 
-        # create copy of original image
-        self.original_image = resizedImage.copy()
+            # create copy of original image
+            self.original_image = resizedImage.copy()
 
-        contours, hierarchy = self.findContoursAndHierarchy(resizedImage);
-        #Store digits
-        self.storeDetectedDigits(resizedImage,contours);
+            with profiler.stage("findDigits"):
+                contours, hierarchy = self.findContoursAndHierarchy(resizedImage);
+                #Store digits
+                self.storeDetectedDigits(resizedImage,contours);
         #Fill remaining spaces with 0s
         self.fillEmptySpaces();
         #Print solution on original image
@@ -63,7 +99,7 @@ class SudokuSolver:
         return contours,hierarchy;
 
 # Find largest rectangle in image
-    def findLargestRect(self,contours): 
+    def findLargestRect(self,image,contours): 
         highest = 0
         bounding_rect = None
         for cnt in contours:
@@ -76,7 +112,7 @@ class SudokuSolver:
         # if highest rectangle is found crop image
         if not highest == 0:
             x,y,w,h = bounding_rect
-            self.image = tmp_image[y:y+h, x:x+w]
+            self.image = image[y:y+h, x:x+w]
         #return image
 
 
@@ -85,6 +121,9 @@ class SudokuSolver:
 
 
     def storeDetectedDigits(self,image,contours):        
+        # crops of detected digits with the name of their cell
+        digitImages = []
+
         # iterate detected numbers
         for cnt in contours:
 
@@ -101,27 +140,152 @@ class SudokuSolver:
                 x_middle = int(x+(w/2))
                 y_middle = int(y+(h/2))
 
-                # compute coordinates of rectangle
-                x_coord = int(x_middle/self.inner_rect_width)
-                y_coord = int(y_middle/self.inner_rect_width)
+                # compute coordinates of rectangle, 9 fields of int(500/9) leave a few pixels at the edge which belong to the last one
+                x_coord = min(int(x_middle/self.inner_rect_width), 8)
+                y_coord = min(int(y_middle/self.inner_rect_width), 8)
 
-                # crop image part where a digit is detected
-                tmp_image = image[y-2:y+h+2, x-2:x+w+2]
+                # crop image part where a digit is detected, a digit at the top or left edge is cropped from 0
+                tmp_image = image[max(y-2,0):y+h+2, max(x-2,0):x+w+2]
                 gray = cv2.cvtColor(tmp_image, cv2.COLOR_BGR2GRAY)
                 blurred = cv2.GaussianBlur(gray, (5, 5), 0)
 
-                # use tesseract to detect digits from cropped image parts
-                config = ("--oem 2 --psm 10")
-                detected_digit = pytesseract.image_to_string(blurred, lang="eng", config=config)
-
-                # store detected digit
-                self.sudoku[self.rows[y_coord]+self.columns[x_coord]] = str(detected_digit)
+                digitImages.append((self.rows[y_coord]+self.columns[x_coord], blurred))
 
                 #cv2.rectangle(image, (x,y), (x+w,y+h), (0,255,0), 2)
                 #cv2.rectangle(image, (x_middle,y_middle), (x_middle,y_middle), (255,0,0), 2)
                 #font = cv2.FONT_HERSHEY_PLAIN
                 #cv2.putText(image, str(x_coord)+":"+str(y_coord), (x,y), font, 1, (0,0,0), 1, cv2.LINE_AA)
 
+        self.recognizeAndStoreDigits(digitImages)
+
+    # split the warped puzzle into 81 cell views without copying, view[r, c] is the cell in row r and column c
+    def sliceCells(self,image):
+        cell_size = min(image.shape[:2])//9
+        row_stride, col_stride = image.strides[:2]
+        return np.lib.stride_tricks.as_strided(image, shape=(9,9,cell_size,cell_size), strides=(cell_size*row_stride,cell_size*col_stride,row_stride,col_stride), writeable=False)
+
+    # find the cells holding a digit by their ink density and pass only those to the recognizer
+    def storeDigitsFromFixedGrid(self,image):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        if gray.dtype != np.uint8:
+            gray = gray.astype(np.uint8)
+
+        # dark pixels compared with their neighbourhood are ink, so shadows on the paper are not
+        ink = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 15)
+
+        cells = self.sliceCells(gray)
+        cell_size = cells.shape[2]
+        margin = max(1, int(cell_size*CELL_MARGIN))
+
+        # remove the grid lines, which are straight strokes longer than any digit, so digits touching them stay separate
+        line_length = int(cell_size*0.8)
+        lines = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (line_length,1)))
+        lines |= cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1,line_length)))
+        ink &= ~lines
+        ink_cells = self.sliceCells(ink)
+
+        # one vectorized test for all 81 cells on the center of every cell
+        density = (ink_cells[:, :, margin:cell_size-margin, margin:cell_size-margin] > 0).mean(axis=(2,3))
+        digitImages = []
+        for y_coord, x_coord in np.argwhere(density > INK_DENSITY_THRESHOLD):
+            digit = self.findDigitInCell(ink_cells[y_coord, x_coord], margin)
+            if digit is None:
+                continue
+            # keep only the pixels of the digit, everything else in its bounding rectangle becomes paper
+            ys, xs = np.nonzero(digit)
+            top, bottom, left, right = max(ys.min()-2,0), ys.max()+3, max(xs.min()-2,0), xs.max()+3
+            tmp_image = np.where(digit[top:bottom, left:right], cells[y_coord, x_coord][top:bottom, left:right], np.uint8(255))
+            blurred = cv2.GaussianBlur(tmp_image, (5, 5), 0)
+            digitImages.append((self.rows[y_coord]+self.columns[x_coord], blurred))
+
+        self.recognizeAndStoreDigits(digitImages)
+
+    # mask of the largest ink feature with its center inside the center of a cell or None, specks at the edges are left out
+    def findDigitInCell(self,ink_cell,margin):
+        cell_size = ink_cell.shape[0]
+        count, labels, stats, centroids = cv2.connectedComponentsWithStats(np.ascontiguousarray(ink_cell), connectivity=8)
+        best = None
+        for label in range(1, count):
+            center_x, center_y = centroids[label]
+            if margin <= center_x < cell_size-margin and margin <= center_y < cell_size-margin:
+                if best is None or stats[label, cv2.CC_STAT_AREA] > stats[best, cv2.CC_STAT_AREA]:
+                    best = label
+        if best is None:
+            return None
+        return labels == best
+
+    # read the digits of the cropped image parts and store them in their cells
+    def recognizeAndStoreDigits(self,digitImages):
+        images = [digitImage for key,digitImage in digitImages]
+        with self.profiler.stage("recognizeDigits"):
+            if self.recognitionCache is not None:
+                detectedDigits = self.recognitionCache.recognizeDigits(images, self.recognizeDigits)
+            else:
+                detectedDigits = self.recognizeDigits(images)
+
+        # store detected digits, cells where the tiled image gave no digit stay empty
+        for (key,digitImage),detected_digit in zip(digitImages,detectedDigits):
+            if self.batchOCR and detected_digit == "":
+                continue
+            self.sudoku[key] = detected_digit
+
+    # read the digits of cropped image parts with the selected recognizer
+    def recognizeDigits(self,digitImages):
+        self.profiler.count("digitsRecognized", len(digitImages))
+        if self.recognizer is not None:
+            self.profiler.count("recognizerCalls")
+            return self.recognizer.recognizeDigits(digitImages)
+        elif self.batchOCR:
+            return self.recognizeDigitsBatched(digitImages)
+        return [self.recognizeDigit(digitImage) for digitImage in digitImages]
+
+    # use tesseract to detect the digit of a single cropped image part
+    def recognizeDigit(self,digitImage):
+        import pytesseract
+        self.profiler.count("ocrCalls")
+        detected_digit = pytesseract.image_to_string(digitImage, lang="eng", config=OCR_CONFIG)
+        return str(detected_digit)
+
+    # use tesseract once to detect the digits of all cropped image parts
+    # the crops are placed on a grid of equally sized tiles and every glyph box is mapped back to its tile by its center
+    def recognizeDigitsBatched(self,digitImages):
+        if len(digitImages) == 0:
+            return []
+
+        # tiles leave a margin of half a digit around every crop so tesseract reads them as separate glyphs
+        max_h = max(digitImage.shape[0] for digitImage in digitImages)
+        max_w = max(digitImage.shape[1] for digitImage in digitImages)
+        margin = max(max_h,max_w)//2
+        tile_h = max_h+2*margin
+        tile_w = max_w+2*margin
+        tiles_per_row = 9
+        tile_rows = (len(digitImages)+tiles_per_row-1)//tiles_per_row
+        composite = np.full((tile_rows*tile_h, tiles_per_row*tile_w), 255, dtype=np.uint8)
+        for i,digitImage in enumerate(digitImages):
+            h,w = digitImage.shape[:2]
+            top = (i//tiles_per_row)*tile_h+margin
+            left = (i%tiles_per_row)*tile_w+margin
+            composite[top:top+h, left:left+w] = digitImage
+
+        # each line of image_to_boxes is "glyph left bottom right top page" with the origin at the bottom left
+        import pytesseract
+        self.profiler.count("ocrCalls")
+        boxes = pytesseract.image_to_boxes(composite, lang="eng", config=BATCH_OCR_CONFIG)
+        glyphs = [[] for _ in digitImages]
+        composite_h = composite.shape[0]
+        for line in boxes.splitlines():
+            parts = line.split()
+            if len(parts) < 5 or parts[0] not in self.columns:
+                continue
+            left,bottom,right,top = (int(value) for value in parts[1:5])
+            center_x = (left+right)//2
+            center_y = composite_h-(bottom+top)//2
+            tile = (center_y//tile_h)*tiles_per_row+center_x//tile_w
+            if 0 <= tile < len(glyphs):
+                glyphs[tile].append(parts[0])
+        # a tile holds one digit, a tile with no glyph or with a split or extra glyph is left unread
+        return [tileGlyphs[0] if len(tileGlyphs) == 1 else "" for tileGlyphs in glyphs]
+
     def fillEmptySpaces(self):
         # fill empty spaces with 0
         for r in self.rows:
@@ -137,13 +301,26 @@ class SudokuSolver:
         # generate string from detected sudoku
         detected_sudoku_string = ss.generate_string_from_sudoku(self.sudoku)
 
-        # solve sudoku
-        solved_sudoku = ss.solve_sudoku(detected_sudoku_string)
+        # solve sudoku and look for a second solution in the same search, the search is only counted while profiling
+        with self.profiler.stage("solveSudoku"):
+            if self.profiler.enabled:
+                stats = SolverStats()
+                solved_sudoku, solution_count = ss.solve_and_count(detected_sudoku_string, limit=2, stats=stats)
+                self.profiler.count("solverNodes", stats.nodes)
+            else:
+                solved_sudoku, solution_count = ss.solve_and_count(detected_sudoku_string, limit=2)
+
+        self.detected = detected_sudoku_string
 
         # check if sudoku was valid and can be solved
         if solved_sudoku == False:
-            print("Not Solvable")
-            sys.exit(0)
+            raise SudokuImageError("Not Solvable", grid=detected_sudoku_string)
+
+        # check if the detected sudoku has only one solution, otherwise digits were probably misread
+        if solution_count > 1:
+            raise SudokuImageError("Not Unique", grid=detected_sudoku_string)
+
+        self.solution = ss.generate_string_from_sudoku(solved_sudoku)
 
         # print solution into image
         font = cv2.FONT_HERSHEY_COMPLEX
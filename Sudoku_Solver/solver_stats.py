@@ -0,0 +1,34 @@
+#!/usr/bin/python3
+"""
+Search statistics collected by the bitmask backend when a SolverStats object is passed to solve_sudoku
+"""
+
+
+class SolverStats:
+    def __init__(self):
+        # branches tried by the search
+        self.nodes = 0
+        # deepest level of the search stack
+        self.max_depth = 0
+        # branching cells whose digits were all tried without a solution
+        self.backtracks = 0
+        # calls to the constraint propagation, one per given digit and per branch
+        self.propagations = 0
+        # cells whose candidates were reduced by the propagation during the search
+        self.eliminations = 0
+        # propagations which ended in a contradiction
+        self.contradictions = 0
+        # seconds spent in constraint propagation and in the rest of the search
+        self.propagation_time = 0.0
+        self.branching_time = 0.0
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    # json is imported here, importing it with the solver would double the start up time of the solver
+    def to_json(self):
+        import json
+        return json.dumps(self.to_dict())
+
+    def __repr__(self):
+        return "SolverStats(" + ", ".join(key + "=" + repr(value) for key, value in vars(self).items()) + ")"
@@ -3,6 +3,8 @@
 Retrieved from: https://github.com/KleinSamuel/sudoku-solver
 """
 import sys
+import time
+import Sudoku_Solver.bitmask_solver as bitmask_solver
 '''
 # strings for example sudokus where .=0
 easy1 = ".94...13..............76..2.8..1.....32.........2...6.....5.4.......8..7..63.4..8"
@@ -41,18 +43,16 @@ for i in range(0,9,3):
 valuesToCompare = (comb_1 + comb_2 + comb_3)
 
 # Dict with cellname as key and name of row, col, block this cell is in as value
-comb_dict = {}
-for cell in cells:
-    tmp = []
-    for comb in valuesToCompare:
-        if cell in comb:
-            tmp.append(comb)
-    comb_dict[cell] = tmp
+# Filled in one pass over the combinations instead of searching every combination for every cell
+comb_dict = {cell: [] for cell in cells}
+for comb in valuesToCompare:
+    for cell in comb:
+        comb_dict[cell].append(comb)
 
 # Set with cellname as key and unique set of cells of row, col, block this cell is in
 comb_set = {}
 for cell in cells:
-    comb_set[cell] = set(sum(comb_dict[cell],[]))-set([cell])
+    comb_set[cell] = set().union(*comb_dict[cell])-{cell}
 
 # Create dict from sudoku string with cellname as key and list of possible numbers as value
 def create_dict_from_sudoku_string(grid):
@@ -122,10 +122,89 @@ def printSudoku(tmp_dict):
         if r in "CF": print(line)
     print(line)
 '''
-# Solve given sudoku string
-def solve_sudoku(sudoku_string):
+# Solve given sudoku string with the bitmask backend
+def solve_bitmask(sudoku_string, stats=None):
+    if stats is None:
+        solution = bitmask_solver.solve(sudoku_string)
+    else:
+        solution = bitmask_solver.search_iterative(bitmask_solver.parse_grid(sudoku_string, stats), stats=stats)
+    if solution is False:
+        return False
+    return bitmask_solver.candidates_to_dict(solution)
+
+# Solve given sudoku string with the string dict backend
+def solve_dict(sudoku_string):
     return recursive_solve(create_dict_from_sudoku_string(sudoku_string))
 
+# Solve given sudoku string with the dancing links backend
+# The module builds its link matrix when it is imported, so it is only imported once the backend is used
+def solve_dlx(sudoku_string):
+    import Sudoku_Solver.dlx_solver as dlx_solver
+    return dlx_solver.solve(sudoku_string)
+
+# Solver backends selectable by name
+backends = {
+    "bitmask": solve_bitmask,
+    "dlx": solve_dlx,
+    "dict": solve_dict,
+}
+
+# Solve given sudoku string with the chosen backend
+# Search statistics are collected in stats if a SolverStats object is given, only the bitmask backend collects them and the others raise ValueError
+# Puzzles are looked up in cache first if a SolutionCache is given, only puzzles it has not seen are searched
+# Returns dict with cellname as key and the solved number as value or False
+def solve_sudoku(sudoku_string, backend="bitmask", stats=None, cache=None):
+    if backend not in backends:
+        raise ValueError("Unknown solver backend: " + str(backend))
+    if cache is not None:
+        if stats is not None:
+            raise ValueError("Search statistics are not collected for puzzles solved through a cache")
+        return cache.solve_sudoku(sudoku_string, backend)
+    if stats is None:
+        return backends[backend](sudoku_string)
+    if backend != "bitmask":
+        raise ValueError("Search statistics are only collected by the bitmask backend, not by " + backend)
+    return solve_bitmask(sudoku_string, stats)
+
+# Result of solve_sudoku_with_budget when the budget runs out before the search finishes
+BUDGET_EXCEEDED = bitmask_solver.BUDGET_EXCEEDED
+
+# Solve given sudoku string, trying at most max_nodes branches and stopping at the deadline
+# deadline is a time.monotonic() value, timeout is a number of seconds from now
+# Search statistics are collected in stats if a SolverStats object is given
+# Returns dict with cellname as key and the solved number as value, False or BUDGET_EXCEEDED
+def solve_sudoku_with_budget(sudoku_string, max_nodes=None, deadline=None, timeout=None, stats=None):
+    if timeout is not None:
+        timeout_deadline = time.monotonic() + timeout
+        deadline = timeout_deadline if deadline is None else min(deadline, timeout_deadline)
+    solution = bitmask_solver.search_iterative(bitmask_solver.parse_grid(sudoku_string, stats), max_nodes, deadline, stats)
+    if solution is False or solution is BUDGET_EXCEEDED:
+        return solution
+    return bitmask_solver.candidates_to_dict(solution)
+
+# Count the solutions of given sudoku string, stopping as soon as limit solutions are found
+def count_solutions(sudoku_string, limit=2):
+    return bitmask_solver.count_solutions(bitmask_solver.parse_grid(sudoku_string), limit)
+
+# Check if given sudoku string has exactly one solution
+def is_unique(sudoku_string):
+    return count_solutions(sudoku_string, limit=2) == 1
+
+# Solve given sudoku string and count its solutions in the same search, stopping as soon as limit solutions are found
+# Search statistics are collected in stats if a SolverStats object is given
+# Returns (dict with cellname as key and the solved number as value of the first solution or False, number of solutions)
+def solve_and_count(sudoku_string, limit=2, stats=None):
+    solution = False
+    count = 0
+    for candidates in bitmask_solver.iterate_solutions(bitmask_solver.parse_grid(sudoku_string, stats), stats=stats):
+        if count == 0:
+            # the candidate list is changed again when the search resumes, so the first solution is converted now
+            solution = bitmask_solver.candidates_to_dict(candidates)
+        count += 1
+        if count >= limit:
+            break
+    return solution, count
+
 # To recursively Solve
 def recursive_solve(tmp_dict):
     if tmp_dict is False:
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 
 import os
-from random import randint, shuffle
 
 #InputFileDetails
 sudokuImageFolder="dataset/sudokuImage"
@@ -12,5 +11,26 @@ OUTPUT_PATH = "./dataset/sudokuImage/"+"image5_solution.jpg"
 #Decides whether image should be displayed when in console mode
 DISPLAY_IMG=True
 
+#Decides whether tesseract runs once per puzzle on a tiled image of all digits instead of once per digit
+BATCH_OCR=False
+
+#Decides which engine reads the digits: "tesseract" or "classifier" (in-process classifier in Recognizer/digitClassifier.py)
+DIGIT_RECOGNIZER="tesseract"
+
+#Decides whether digits are read from the 81 cells of the warped puzzle instead of from detected contours (False)
+#The fixed grid is the default because it is the more accurate locator: with the classifier it reads 1645 of the 1701 dataset
+#cells correctly and solves 3 of the 21 grids, contours read 1506 cells and solve none (Benchmark/benchmark_suite.py)
+FIXED_GRID=True
+
+#Decides where recognized digits are kept between runs (JSON file), None recognizes every digit without a cache
+RECOGNITION_CACHE_PATH=None
+
+#Decides how many times the image is halved before the grid is searched (0 searches the full image), corners are refined on the full image
+#1 finds the same grids as 0 on the dataset, 2 is faster but misses the corners of some photographed newspapers
+DETECTION_PYRAMID_LEVELS=1
+
+#Decides whether extraction skips the images only needed for debug drawing and resizes the warped puzzle once
+COPY_FREE_EXTRACTION=True
+
 MAXIMUM_HEIGHT=900
 MAXIMUM_WIDTH=900
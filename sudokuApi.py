@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Library interface of the sudoku solver for programs, workers and services which import it instead of running a script
+Importing it has no side effects and only loads the string solver, OpenCV, NumPy and the image pipeline are imported
+the first time an image is solved and tesseract only when it reads digits
+USAGE:
+	import sudokuApi
+	sudokuApi.solveSudokuString(".94...13..............76..2.8..1.....32.........2...6.....5.4.......8..7..63.4..8")
+	sudokuApi.solveSudokuImage("dataset/sudokuImage/image1.jpg",recognizer="classifier")
+"""
+
+import settings
+import Sudoku_Solver.sudoku_solver as ss
+
+#Recognizers by name, built by the first image which needs them and reused by every later one
+recognizers={}
+
+
+"""
+Result of solveSudokuImage, a plain class because collections takes longer to import than the whole string solver
+grid and solution are strings of 81 digits (0 for blanks), image is the puzzle with the solution drawn onto it
+"""
+class ImageSolution:
+	def __init__(self,grid,solution,image):
+		self.grid=grid
+		self.solution=solution
+		self.image=image
+
+
+"""
+Solve a sudoku string of 81 characters (0 or . for blanks) with a backend of Sudoku_Solver/sudoku_solver.py
+cache is an optional Sudoku_Solver.solution_cache.SolutionCache shared by the calls, repeated and isomorphic puzzles are not searched again
+Returns the solution as a string of 81 digits or None if the sudoku cannot be solved
+"""
+def solveSudokuString(puzzle,backend="bitmask",cache=None):
+	if(len(puzzle)!=81):
+		raise ValueError("A sudoku string has 81 characters, got %d"%len(puzzle))
+	solution=ss.solve_sudoku(puzzle,backend=backend,cache=cache)
+	if(solution is False):
+		return None
+	return ss.generate_string_from_sudoku(solution)
+
+"""
+Check whether a sudoku string has exactly one solution
+"""
+def isUniqueSudokuString(puzzle):
+	return ss.is_unique(puzzle)
+
+"""
+Return the recognizer for a name ("classifier" or "tesseract"), None stands for tesseract inside SudokuSolver
+"""
+def getRecognizer(name=None):
+	if(name is None):
+		name=settings.DIGIT_RECOGNIZER
+	if(name=="tesseract"):
+		return None
+	if(name not in recognizers):
+		if(name!="classifier"):
+			raise ValueError("Unknown digit recognizer: "+str(name))
+		from Recognizer.digitClassifier import DigitClassifier
+		recognizers[name]=DigitClassifier()
+	return recognizers[name]
+
+"""
+Read and solve the sudoku in an image without any window or file output
+image can be anything ResizeSudokuImage accepts: a path, encoded bytes, a file object or a decoded image
+recognizer is a name for getRecognizer or a recognizer object
+Raises Sudoku.sudokuImageError.SudokuImageError if the image cannot be read or its sudoku cannot be solved, the error holds the recognized grid
+"""
+def solveSudokuImage(image,recognizer=None,recognitionCache=None,profiler=None):
+	import Displayer.displayer as Displayer
+	from Sudoku.resizeSudokuImage import ResizeSudokuImage
+	from Extractor.extractSudokuPuzzle import ExtractSudokuPuzzle
+	from Sudoku_Solver.solve_sudoku_from_image import SudokuSolver
+	from Profiler.pipelineProfiler import NULL_PROFILER
+
+	if(recognizer is None or isinstance(recognizer,str)):
+		recognizer=getRecognizer(recognizer)
+	if(profiler is None):
+		profiler=NULL_PROFILER
+	display=Displayer.Display(mode="none")
+	resized=ResizeSudokuImage(image,settings.MAXIMUM_WIDTH,settings.MAXIMUM_HEIGHT,display,profiler=profiler)
+	extractedSudokuPuzzle=ExtractSudokuPuzzle(resized.sudokuImage,display,profiler=profiler)
+	sudokuSol=SudokuSolver(extractedSudokuPuzzle.postProcessedExtracted,display,batchOCR=settings.BATCH_OCR,recognizer=recognizer,
+		fixedGrid=settings.FIXED_GRID,recognitionCache=recognitionCache,profiler=profiler)
+	return ImageSolution(sudokuSol.detected,sudokuSol.solution,sudokuSol.original_image)
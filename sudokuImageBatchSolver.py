@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Solves every sudoku image in the given directories and files in a pool of worker processes
+One JSON object per image is written in input order (JSON Lines) to stdout or the output file:
+{"path", "grid", "solution", "error", "timings", "recognitionCache"} with the detected and solved sudoku strings, the seconds spent
+in every stage and the hits and misses of the recognition cache (null without --recognition-cache)
+With --recognition-cache digits recognized by any worker are merged into one cache, which is saved to that file for the next batch,
+without it every digit is recognized, as a cache keyed by a hash of the cell image could return the digit of a similar cell
+With --profile every result also has a "profile" with the wall and CPU time of the finer stages and counts like contours examined,
+OCR calls and solver nodes, --cprofile adds the slowest functions, the percentiles over the batch are written to stderr or --profile-summary
+USAGE: python3 sudokuImageBatchSolver.py dataset/sudokuImage [image.jpg ...] [-o results.jsonl] [--workers 4] [--recognition-cache cache.json]
+	[--profile] [--cprofile] [--profile-summary summary.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from settings import *
+import Displayer.displayer as Displayer
+from Sudoku.resizeSudokuImage import ResizeSudokuImage
+from Extractor.extractSudokuPuzzle import ExtractSudokuPuzzle
+from Sudoku_Solver.solve_sudoku_from_image import SudokuSolver
+from Sudoku.sudokuImageError import SudokuImageError
+from Recognizer.recognitionCache import RecognitionCache
+from Profiler.pipelineProfiler import PipelineProfiler, NULL_PROFILER, aggregateProfiles
+
+IMAGE_EXTENSIONS=(".jpg",".jpeg",".png",".bmp",".tif",".tiff",".webp")
+
+#Recognizer of the worker process, built once by initializeWorker instead of once per image
+workerRecognizer=None
+#Recognition cache of the worker process, its new entries are sent back with every result, None without --recognition-cache
+workerRecognitionCache=None
+#Profiler of the worker process, reset for every image
+workerProfiler=NULL_PROFILER
+
+
+"""
+Expand directories into the images they contain, sorted so image2 comes before image10
+"""
+def findImages(paths):
+	naturalKey=lambda name: [int(part) if part.isdigit() else part for part in re.split(r"(\d+)",name)]
+	images=[]
+	for path in paths:
+		if(os.path.isdir(path)):
+			names=sorted((name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS)),key=naturalKey)
+			images.extend(os.path.join(path,name) for name in names)
+		else:
+			images.append(path)
+	return images
+
+def initializeWorker(recognizerName,cachePath=None,profile=False,cprofile=False):
+	global workerRecognizer,workerRecognitionCache,workerProfiler
+	if(recognizerName=="classifier"):
+		from Recognizer.digitClassifier import DigitClassifier
+		workerRecognizer=DigitClassifier()
+	workerRecognitionCache=RecognitionCache(path=cachePath,trackNewEntries=True) if cachePath else None
+	workerProfiler=PipelineProfiler(cprofile=cprofile) if profile or cprofile else NULL_PROFILER
+
+"""
+Run resize -> extract -> solve on one image without any window or file output
+Errors of a stage are recorded in the result instead of stopping the batch
+"""
+def processImage(imagePath):
+	display=Displayer.Display(mode="none")
+	result={"path":imagePath,"grid":None,"solution":None,"error":None,"timings":{},"recognitionCache":None}
+	timings=result["timings"]
+	if(workerRecognitionCache is not None):
+		hits,misses=workerRecognitionCache.hits,workerRecognitionCache.misses
+	profiler=workerProfiler
+	profiler.reset()
+	profiler.start()
+	stage="resize"
+	try:
+		start=time.perf_counter()
+		resized=ResizeSudokuImage(imagePath,MAXIMUM_WIDTH,MAXIMUM_HEIGHT,display,profiler=profiler)
+		timings["resize"]=time.perf_counter()-start
+
+		stage="extract"
+		start=time.perf_counter()
+		extractedSudokuPuzzle=ExtractSudokuPuzzle(resized.sudokuImage,display,profiler=profiler)
+		timings["extract"]=time.perf_counter()-start
+
+		stage="solve"
+		start=time.perf_counter()
+		sudokuSol=SudokuSolver(extractedSudokuPuzzle.postProcessedExtracted,display,batchOCR=BATCH_OCR,recognizer=workerRecognizer,fixedGrid=FIXED_GRID,recognitionCache=workerRecognitionCache,profiler=profiler)
+		timings["solve"]=time.perf_counter()-start
+		result["grid"]=sudokuSol.detected
+		result["solution"]=sudokuSol.solution
+	except SudokuImageError as error:
+		timings[stage]=time.perf_counter()-start
+		result["grid"]=error.grid
+		result["error"]=str(error)
+	except Exception as error:
+		timings[stage]=time.perf_counter()-start
+		result["error"]="%s in %s: %s"%(type(error).__name__,stage,error)
+	finally:
+		profiler.stop()
+	timings["total"]=sum(timings.values())
+	if(workerRecognitionCache is not None):
+		result["recognitionCache"]={"hits":workerRecognitionCache.hits-hits,"misses":workerRecognitionCache.misses-misses}
+	if(profiler.enabled):
+		result["profile"]=profiler.toDict()
+	return result
+
+"""
+Process one image and return its result with the digits the worker recognized for it
+"""
+def processImageInWorker(imagePath):
+	result=processImage(imagePath)
+	return result,workerRecognitionCache.takeNewEntries() if workerRecognitionCache is not None else []
+
+"""
+Yield the result of every image and the newly recognized digits in input order, images are handed to the workers one at a time
+"""
+def processImages(imagePaths,workers,recognizerName,cachePath=None,profile=False,cprofile=False):
+	if(workers==1):
+		initializeWorker(recognizerName,cachePath,profile,cprofile)
+		for imagePath in imagePaths:
+			yield processImageInWorker(imagePath)
+		return
+	with multiprocessing.Pool(workers,initializer=initializeWorker,initargs=(recognizerName,cachePath,profile,cprofile)) as pool:
+		for result in pool.imap(processImageInWorker,imagePaths):
+			yield result
+
+def main():
+	parser=argparse.ArgumentParser(description="Solve sudoku images from directories and files, one JSON result per line")
+	parser.add_argument("paths",nargs="+",help="image files or directories of images")
+	parser.add_argument("-o","--output",help="output file, stdout if not given")
+	parser.add_argument("--workers",type=int,default=multiprocessing.cpu_count())
+	parser.add_argument("--recognizer",default=DIGIT_RECOGNIZER,choices=("tesseract","classifier"))
+	parser.add_argument("--recognition-cache",default=RECOGNITION_CACHE_PATH,help="JSON file the recognized digits are loaded from and saved to, no cache is used without it")
+	parser.add_argument("--profile",action="store_true",help="add the time of every pipeline stage and the work counts to each result")
+	parser.add_argument("--cprofile",action="store_true",help="like --profile and also add the slowest functions measured by cProfile")
+	parser.add_argument("--profile-summary",help="file for the percentiles of the profiled stages over the batch, stderr if not given")
+	args=parser.parse_args()
+
+	if(args.workers<1):
+		parser.error("--workers must be at least 1")
+
+	imagePaths=findImages(args.paths)
+	output=open(args.output,"w") if args.output else sys.stdout
+	recognitionCache=RecognitionCache(path=args.recognition_cache) if args.recognition_cache else None
+	profile=args.profile or args.cprofile or args.profile_summary is not None
+	profiles=[]
+	solved=0
+	start=time.perf_counter()
+	try:
+		for result,newEntries in processImages(imagePaths,min(args.workers,max(1,len(imagePaths))),args.recognizer,args.recognition_cache,profile,args.cprofile):
+			output.write(json.dumps(result)+"\n")
+			output.flush()
+			if(result["solution"] is not None):
+				solved+=1
+			if(profile):
+				profiles.append(result["profile"])
+			if(recognitionCache is not None):
+				recognitionCache.hits+=result["recognitionCache"]["hits"]
+				recognitionCache.misses+=result["recognitionCache"]["misses"]
+				for key,digit in newEntries:
+					recognitionCache.store(key,digit)
+	finally:
+		if(output is not sys.stdout):
+			output.close()
+		if(recognitionCache is not None):
+			recognitionCache.save()
+	elapsed=time.perf_counter()-start
+
+	print("Solved %d of %d images in %.2f s"%(solved,len(imagePaths),elapsed),file=sys.stderr)
+	if(recognitionCache is not None):
+		print("Recognition cache: %(hits)d hits, %(misses)d misses, %(size)d digits cached"%recognitionCache.stats(),file=sys.stderr)
+	if(profile):
+		summary=json.dumps(aggregateProfiles(profiles),indent=2)
+		if(args.profile_summary):
+			with open(args.profile_summary,"w") as f:
+				f.write(summary+"\n")
+		else:
+			print(summary,file=sys.stderr)
+
+if __name__=="__main__":
+	main()
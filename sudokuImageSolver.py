@@ -5,37 +5,60 @@ USAGE: ./sudokuImageSolver_console.py to launch in console
 """
 
 import cv2
-import numpy as np
+import sys
 from settings import *
 import Displayer.displayer as Displayer
 from Sudoku.resizeSudokuImage import ResizeSudokuImage
 from Extractor.extractSudokuPuzzle import ExtractSudokuPuzzle
 from Sudoku_Solver.solve_sudoku_from_image import SudokuSolver
+from Sudoku.sudokuImageError import SudokuImageError
+from Recognizer.recognitionCache import RecognitionCache
 
 
 
 class SudokuImageSolver:
-	def main(self):
-		display=Displayer.Display()
+	"""
+	Runs ResizeSudokuImage -> ExtractSudokuPuzzle -> SudokuSolver, every stage hands its image to the next one in memory
+	The image with the solution is only written to disk if an outputPath is given
+	"""
+	def main(self,imagePath=sudokuImagePath,outputPath=None,display=None,recognizer=None,recognitionCache=None):
+		if(display is None):
+			display=Displayer.Display()
 
 		#resize sudoku image
-		resized=ResizeSudokuImage(sudokuImagePath,MAXIMUM_WIDTH,MAXIMUM_HEIGHT,display)
+		resized=ResizeSudokuImage(imagePath,MAXIMUM_WIDTH,MAXIMUM_HEIGHT,display)
 
 		#extract sudoku puzzle from sudoku image
 		extractedSudokuPuzzle=ExtractSudokuPuzzle(resized.sudokuImage,display)
 
-		#The extracted sudoku puzzle is written to output_ path and read from there
-		image = cv2.imread(OUTPUT_PATH)
-		#The picture is resized, once to extract the puzzle, and then resize the image again to rescale intensity to get
-		#the ocr engine to read the digits
+		#The in-process classifier replaces tesseract if it is selected in settings
+		if(recognizer is None and DIGIT_RECOGNIZER=="classifier"):
+			from Recognizer.digitClassifier import DigitClassifier
+			recognizer=DigitClassifier()
 
-		#The image read is passed on to the solver
-		sudokuSol = SudokuSolver(image, display);
+		#Digits recognized in earlier runs are read from the cache file if one is set in settings
+		if(recognitionCache is None and RECOGNITION_CACHE_PATH is not None):
+			recognitionCache=RecognitionCache(path=RECOGNITION_CACHE_PATH)
+
+		#The grayscale, intensity rescaled puzzle is passed on to the solver
+		sudokuSol = SudokuSolver(extractedSudokuPuzzle.postProcessedExtracted, display, batchOCR=BATCH_OCR, recognizer=recognizer, fixedGrid=FIXED_GRID, recognitionCache=recognitionCache);
+
+		if(recognitionCache is not None and recognitionCache.path is not None):
+			recognitionCache.save()
+
+		if(outputPath is not None):
+			cv2.imwrite(outputPath,sudokuSol.original_image)
 		
 		#Destroy all windows at the end
-		if(DISPLAY_IMG):
-			cv2.destroyAllWindows()
+		display.close()
+
+		return sudokuSol
 
 
-sudokuImageSolver=SudokuImageSolver()
-sudokuImageSolver.main()
\ No newline at end of file
+if __name__=="__main__":
+	sudokuImageSolver=SudokuImageSolver()
+	try:
+		sudokuImageSolver.main(outputPath=OUTPUT_PATH)
+	except SudokuImageError as error:
+		print(error)
+		sys.exit(0)
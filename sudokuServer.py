@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Local HTTP service solving sudoku images and strings with warm worker processes, only the standard library is needed
+	POST /solve/image   body: the encoded image (JPEG, PNG, ...)   -> {"grid", "solution"}
+	POST /solve/string  body: 81 characters (0 or . for blanks) or {"puzzle": "..."}   -> {"puzzle", "solution"}
+	GET  /metrics       queue depths, request counts and latency and batch size histograms (Prometheus text, ?format=json for JSON)
+	GET  /health
+Images and strings have their own pool of worker processes, the image workers load OpenCV and the recognizer once when they start
+String solves which arrive while every string worker is busy are queued and sent to the next free worker as one batch
+Requests over the pending limit are answered with 503 at once (backpressure), every request has a deadline (X-Timeout-Ms header,
+capped by --max-timeout) after which it is answered with 504, a puzzle string search stops at it, an image is only skipped by
+the worker if it has not started yet
+Bodies over --max-image-bytes or --max-string-bytes are answered with 413 and the connection is closed without reading them
+Unsolvable or unreadable sudokus are answered with 422, the error holds the recognized grid if there is one
+USAGE: python3 sudokuServer.py [--port 8080] [--image-workers 2] [--string-workers 2] [--recognizer classifier]
+	curl --data-binary @dataset/sudokuImage/image1.jpg localhost:8080/solve/image
+"""
+
+import argparse
+import bisect
+import json
+import math
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import settings
+import sudokuApi
+import Sudoku_Solver.sudoku_solver as ss
+from Sudoku.sudokuImageError import SudokuImageError
+
+#Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS=(0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1.0,2.5,5.0,10.0,30.0)
+#Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS=(1,2,4,8,16,32,64,128,256,512,1024)
+
+#Characters allowed in a puzzle string
+PUZZLE_CHARACTERS=set("0123456789.")
+
+#Worker state, set by the pool initializers
+workerRecognizer=None
+workerBackend="bitmask"
+
+
+def initializeImageWorker(recognizerName):
+	global workerRecognizer
+	#import the whole pipeline and build the recognizer before the first request instead of during it
+	import Displayer.displayer
+	import Sudoku.resizeSudokuImage
+	import Extractor.extractSudokuPuzzle
+	import Sudoku_Solver.solve_sudoku_from_image
+	workerRecognizer=sudokuApi.getRecognizer(recognizerName)
+
+def initializeStringWorker(backend):
+	global workerBackend
+	workerBackend=backend
+
+"""
+Solve one image in a worker, returns (HTTP status, response dict)
+deadline is a time.time() value, images whose deadline passed while they were queued are not processed
+"""
+def solveImageInWorker(data,deadline):
+	if(time.time()>=deadline):
+		return 504,{"error":"Deadline exceeded before the image was processed"}
+	try:
+		result=sudokuApi.solveSudokuImage(data,recognizer=workerRecognizer)
+		return 200,{"grid":result.grid,"solution":result.solution}
+	except SudokuImageError as error:
+		return 422,{"error":str(error),"grid":error.grid}
+	except Exception as error:
+		return 500,{"error":"%s: %s"%(type(error).__name__,error)}
+
+"""
+Solve a batch of puzzle strings in a worker, returns one (HTTP status, response dict) per puzzle
+The bitmask search stops at the deadline of its puzzle, so one pathological puzzle cannot hold the worker
+"""
+def solveStringsInWorker(puzzles,deadlines):
+	results=[]
+	for puzzle,deadline in zip(puzzles,deadlines):
+		remaining=deadline-time.time()
+		if(remaining<=0):
+			results.append((504,{"puzzle":puzzle,"error":"Deadline exceeded before the puzzle was solved"}))
+			continue
+		if(workerBackend=="bitmask"):
+			solution=ss.solve_sudoku_with_budget(puzzle,timeout=remaining)
+		else:
+			solution=ss.solve_sudoku(puzzle,backend=workerBackend)
+		if(solution is ss.BUDGET_EXCEEDED):
+			results.append((504,{"puzzle":puzzle,"error":"Deadline exceeded while solving"}))
+		elif(solution is False):
+			results.append((422,{"puzzle":puzzle,"error":"Not Solvable"}))
+		else:
+			results.append((200,{"puzzle":puzzle,"solution":ss.generate_string_from_sudoku(solution)}))
+	return results
+
+
+class Histogram:
+	def __init__(self,buckets):
+		self.buckets=buckets
+		self.counts=[0]*(len(buckets)+1)
+		self.sum=0.0
+		self.count=0
+
+	def observe(self,value):
+		self.counts[bisect.bisect_left(self.buckets,value)]+=1
+		self.sum+=value
+		self.count+=1
+
+	"""
+	Cumulative counts per upper bound, the last bound is +Inf
+	"""
+	def cumulativeCounts(self):
+		total=0
+		counts=[]
+		for count in self.counts:
+			total+=count
+			counts.append(total)
+		return list(zip([str(bucket) for bucket in self.buckets]+["+Inf"],counts))
+
+	def toDict(self):
+		return {"buckets":dict(self.cumulativeCounts()),"sum":self.sum,"count":self.count}
+
+
+class Metrics:
+	def __init__(self):
+		self.lock=threading.Lock()
+		self.latency={"image":Histogram(LATENCY_BUCKETS),"string":Histogram(LATENCY_BUCKETS)}
+		self.batchSizes=Histogram(BATCH_SIZE_BUCKETS)
+		#(endpoint, status) -> number of responses
+		self.responses={}
+		#gauges read when the metrics are rendered: name -> function returning the current value
+		self.gauges={}
+
+	def observeRequest(self,endpoint,status,seconds):
+		with self.lock:
+			self.latency[endpoint].observe(seconds)
+			self.responses[(endpoint,status)]=self.responses.get((endpoint,status),0)+1
+
+	def observeBatch(self,size):
+		with self.lock:
+			self.batchSizes.observe(size)
+
+	def toDict(self):
+		with self.lock:
+			responses={}
+			for (endpoint,status),count in sorted(self.responses.items()):
+				responses.setdefault(endpoint,{})[str(status)]=count
+			return {
+				"gauges":{name:gauge() for name,gauge in self.gauges.items()},
+				"responses":responses,
+				"latency":{endpoint:histogram.toDict() for endpoint,histogram in self.latency.items()},
+				"batchSize":self.batchSizes.toDict(),
+			}
+
+	"""
+	Render the metrics in the Prometheus text format, so any scraper or load test tool can read them
+	"""
+	def toPrometheus(self):
+		lines=[]
+		with self.lock:
+			for name,gauge in self.gauges.items():
+				lines.append("# TYPE sudoku_%s gauge"%name)
+				lines.append("sudoku_%s %d"%(name,gauge()))
+			lines.append("# TYPE sudoku_responses_total counter")
+			for (endpoint,status),count in sorted(self.responses.items()):
+				lines.append('sudoku_responses_total{endpoint="%s",status="%d"} %d'%(endpoint,status,count))
+			lines.append("# TYPE sudoku_request_duration_seconds histogram")
+			for endpoint,histogram in self.latency.items():
+				for bound,count in histogram.cumulativeCounts():
+					lines.append('sudoku_request_duration_seconds_bucket{endpoint="%s",le="%s"} %d'%(endpoint,bound,count))
+				lines.append('sudoku_request_duration_seconds_sum{endpoint="%s"} %f'%(endpoint,histogram.sum))
+				lines.append('sudoku_request_duration_seconds_count{endpoint="%s"} %d'%(endpoint,histogram.count))
+			lines.append("# TYPE sudoku_string_batch_size histogram")
+			for bound,count in self.batchSizes.cumulativeCounts():
+				lines.append('sudoku_string_batch_size_bucket{le="%s"} %d'%(bound,count))
+			lines.append("sudoku_string_batch_size_sum %d"%self.batchSizes.sum)
+			lines.append("sudoku_string_batch_size_count %d"%self.batchSizes.count)
+		return "\n".join(lines)+"\n"
+
+
+"""
+Counts the requests which were admitted and are not finished by a worker yet, new requests are refused once limit are pending
+"""
+class Admission:
+	def __init__(self,limit):
+		self.limit=limit
+		self.pending=0
+		self.lock=threading.Lock()
+
+	def tryAcquire(self):
+		with self.lock:
+			if(self.pending>=self.limit):
+				return False
+			self.pending+=1
+			return True
+
+	def release(self,number=1):
+		with self.lock:
+			self.pending-=number
+
+
+class StringRequest:
+	def __init__(self,puzzle,deadline):
+		self.puzzle=puzzle
+		self.deadline=deadline
+		self.future=Future()
+
+
+"""
+Groups the string requests waiting in the queue into batches, a batch is only formed when a string worker is free,
+so requests arriving while all workers are busy are solved together and an idle server adds no waiting time
+"""
+class StringBatcher:
+	def __init__(self,pool,workers,maxBatchSize,admission,metrics):
+		self.pool=pool
+		self.maxBatchSize=maxBatchSize
+		self.admission=admission
+		self.metrics=metrics
+		self.queue=queue.Queue()
+		self.freeWorkers=threading.Semaphore(workers)
+		self.thread=threading.Thread(target=self.run,name="StringBatcher",daemon=True)
+		self.thread.start()
+
+	def submit(self,puzzle,deadline):
+		request=StringRequest(puzzle,deadline)
+		self.queue.put(request)
+		return request.future
+
+	def run(self):
+		while(True):
+			self.freeWorkers.acquire()
+			batch=[self.queue.get()]
+			while(len(batch)<self.maxBatchSize):
+				try:
+					batch.append(self.queue.get_nowait())
+				except queue.Empty:
+					break
+
+			#requests whose deadline passed in the queue are answered without sending them to a worker, all others are solved
+			now=time.time()
+			expired=[]
+			solvable=[]
+			for request in batch:
+				if(request.deadline<=now):
+					expired.append(request)
+				else:
+					solvable.append(request)
+			batch=solvable
+			for request in expired:
+				request.future.set_result((504,{"puzzle":request.puzzle,"error":"Deadline exceeded before the puzzle was solved"}))
+			self.admission.release(len(expired))
+			if(not batch):
+				self.freeWorkers.release()
+				continue
+
+			self.metrics.observeBatch(len(batch))
+			self.pool.apply_async(solveStringsInWorker,([request.puzzle for request in batch],[request.deadline for request in batch]),
+				callback=lambda results,batch=batch: self.finish(batch,results),
+				error_callback=lambda error,batch=batch: self.finish(batch,[(500,{"error":"%s: %s"%(type(error).__name__,error)})]*len(batch)))
+
+	def finish(self,batch,results):
+		self.freeWorkers.release()
+		self.admission.release(len(batch))
+		for request,result in zip(batch,results):
+			request.future.set_result(result)
+
+
+class SudokuService:
+	def __init__(self,imageWorkers,stringWorkers,recognizerName,backend,maxPendingImages,maxPendingStrings,maxBatchSize,defaultTimeout,maxTimeout,maxImageBytes,maxStringBytes):
+		self.defaultTimeout=defaultTimeout
+		self.maxTimeout=maxTimeout
+		self.maxImageBytes=maxImageBytes
+		self.maxStringBytes=maxStringBytes
+		self.metrics=Metrics()
+		self.imagePool=multiprocessing.Pool(imageWorkers,initializer=initializeImageWorker,initargs=(recognizerName,))
+		self.stringPool=multiprocessing.Pool(stringWorkers,initializer=initializeStringWorker,initargs=(backend,))
+		self.imageAdmission=Admission(maxPendingImages)
+		self.stringAdmission=Admission(maxPendingStrings)
+		self.batcher=StringBatcher(self.stringPool,stringWorkers,maxBatchSize,self.stringAdmission,self.metrics)
+		self.metrics.gauges["image_queue_depth"]=lambda: self.imageAdmission.pending
+		self.metrics.gauges["string_queue_depth"]=lambda: self.stringAdmission.pending
+		self.metrics.gauges["string_batch_queue_depth"]=self.batcher.queue.qsize
+
+	"""
+	Seconds the request may take, from the X-Timeout-Ms header or the default, never more than the maximum
+	Raises ValueError if the header is not a finite number
+	"""
+	def requestTimeout(self,headers):
+		timeout=self.defaultTimeout
+		if(headers.get("X-Timeout-Ms")):
+			timeout=float(headers["X-Timeout-Ms"])/1000
+			#nan and inf pass float() but no deadline can be computed from them
+			if(not math.isfinite(timeout)):
+				raise ValueError("X-Timeout-Ms is not finite")
+		return min(max(timeout,0.0),self.maxTimeout)
+
+	"""
+	The image pipeline has no deadline checks, so the deadline is only enforced before a worker starts on the image:
+	an image still queued at its deadline is skipped, one being processed runs to the end after the client got its 504
+	"""
+	def solveImage(self,data,timeout):
+		if(not self.imageAdmission.tryAcquire()):
+			return 503,{"error":"Too many pending images, retry later"}
+		deadline=time.time()+timeout
+		#the admission is released when the worker is done, not when the client gives up, so the limit counts busy workers
+		asyncResult=self.imagePool.apply_async(solveImageInWorker,(data,deadline),
+			callback=lambda result: self.imageAdmission.release(),error_callback=lambda error: self.imageAdmission.release())
+		try:
+			return asyncResult.get(timeout=max(deadline-time.time(),0.0))
+		except multiprocessing.TimeoutError:
+			return 504,{"error":"Deadline exceeded"}
+
+	def solveString(self,puzzle,timeout):
+		if(len(puzzle)!=81 or not set(puzzle)<=PUZZLE_CHARACTERS):
+			return 400,{"puzzle":puzzle,"error":"A sudoku string has 81 characters, 0 or . for blanks"}
+		if(not self.stringAdmission.tryAcquire()):
+			return 503,{"puzzle":puzzle,"error":"Too many pending puzzles, retry later"}
+		deadline=time.time()+timeout
+		future=self.batcher.submit(puzzle,deadline)
+		try:
+			return future.result(timeout=max(deadline-time.time(),0.0))
+		except FutureTimeoutError:
+			return 504,{"puzzle":puzzle,"error":"Deadline exceeded"}
+
+	def close(self):
+		self.imagePool.terminate()
+		self.stringPool.terminate()
+
+
+class SudokuRequestHandler(BaseHTTPRequestHandler):
+	#keep connections open between requests, load tests reuse them
+	protocol_version="HTTP/1.1"
+	service=None
+	verbose=False
+
+	def do_GET(self):
+		url=urlsplit(self.path)
+		if(url.path=="/health"):
+			self.sendText(200,"ok\n")
+		elif(url.path=="/metrics"):
+			if(parse_qs(url.query).get("format")==["json"]):
+				self.sendJson(200,self.service.metrics.toDict())
+			else:
+				self.sendText(200,self.service.metrics.toPrometheus(),"text/plain; version=0.0.4")
+		else:
+			self.sendJson(404,{"error":"Unknown path "+url.path})
+
+	def do_POST(self):
+		start=time.perf_counter()
+		path=urlsplit(self.path).path
+		if(path not in ("/solve/image","/solve/string")):
+			self.close_connection=True
+			self.sendJson(404,{"error":"Unknown path "+path})
+			return
+		endpoint="image" if path=="/solve/image" else "string"
+		status,response=self.handleSolve(endpoint)
+		self.service.metrics.observeRequest(endpoint,status,time.perf_counter()-start)
+		headers={"Retry-After":"1"} if status==503 else {}
+		self.sendJson(status,response,headers)
+
+	"""
+	The body is read before anything else is checked, an answer sent without reading it closes the connection,
+	otherwise the unread bytes would be parsed as the next request on it
+	"""
+	def handleSolve(self,endpoint):
+		length=self.headers.get("Content-Length")
+		if(length is None or not length.isdigit()):
+			self.close_connection=True
+			return 411,{"error":"A valid Content-Length is required"}
+		length=int(length)
+		if(endpoint=="image" and length>self.service.maxImageBytes):
+			self.close_connection=True
+			return 413,{"error":"Images are limited to %d bytes"%self.service.maxImageBytes}
+		if(endpoint=="string" and length>self.service.maxStringBytes):
+			self.close_connection=True
+			return 413,{"error":"Puzzle strings are limited to %d bytes"%self.service.maxStringBytes}
+		body=self.rfile.read(length)
+		try:
+			timeout=self.service.requestTimeout(self.headers)
+		except ValueError:
+			return 400,{"error":"X-Timeout-Ms must be a finite number"}
+		if(endpoint=="image"):
+			return self.service.solveImage(body,timeout)
+		body=body.decode("utf-8","replace").strip()
+		if(body.startswith("{")):
+			try:
+				body=str(json.loads(body)["puzzle"])
+			except(ValueError,KeyError,TypeError):
+				return 400,{"error":'The body must be a puzzle string or {"puzzle": "..."}'}
+		return self.service.solveString(body,timeout)
+
+	def sendJson(self,status,response,headers=None):
+		self.sendText(status,json.dumps(response)+"\n","application/json",headers)
+
+	def sendText(self,status,text,contentType="text/plain",headers=None):
+		body=text.encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type",contentType)
+		self.send_header("Content-Length",str(len(body)))
+		for name,value in (headers or {}).items():
+			self.send_header(name,value)
+		if(self.close_connection):
+			#tell the client so it opens a new connection instead of sending the next request on this one
+			self.send_header("Connection","close")
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self,format,*args):
+		if(self.verbose):
+			BaseHTTPRequestHandler.log_message(self,format,*args)
+
+"""
+The listen backlog of socketserver is 5, clients which connect at the same time beyond it are reset before a thread accepts them
+"""
+class SudokuHTTPServer(ThreadingHTTPServer):
+	request_queue_size=128
+	daemon_threads=True
+
+
+def main():
+	parser=argparse.ArgumentParser(description="Serve sudoku image and string solves over HTTP on this machine")
+	parser.add_argument("--host",default="127.0.0.1")
+	parser.add_argument("--port",type=int,default=8080)
+	parser.add_argument("--image-workers",type=int,default=max(1,multiprocessing.cpu_count()//2))
+	parser.add_argument("--string-workers",type=int,default=max(1,multiprocessing.cpu_count()//2))
+	parser.add_argument("--recognizer",default=settings.DIGIT_RECOGNIZER,choices=("tesseract","classifier"))
+	parser.add_argument("--backend",default="bitmask",choices=sorted(ss.backends),help="string solver backend, only bitmask stops at the deadline")
+	parser.add_argument("--max-pending-images",type=int,default=None,help="images admitted before 503 is returned, 4 per image worker by default")
+	parser.add_argument("--max-pending-strings",type=int,default=10000,help="puzzles admitted before 503 is returned")
+	parser.add_argument("--max-batch-size",type=int,default=256,help="most puzzles sent to a string worker at once")
+	parser.add_argument("--timeout",type=float,default=10.0,help="deadline in seconds of requests without X-Timeout-Ms")
+	parser.add_argument("--max-timeout",type=float,default=60.0,help="longest deadline in seconds a request may ask for")
+	parser.add_argument("--max-image-bytes",type=int,default=16*1024*1024)
+	parser.add_argument("--max-string-bytes",type=int,default=1024,help="largest /solve/string body, a JSON puzzle needs about 100")
+	parser.add_argument("--verbose",action="store_true",help="log every request")
+	args=parser.parse_args()
+
+	if(min(args.image_workers,args.string_workers,args.max_pending_strings,args.max_batch_size)<1):
+		parser.error("worker counts, --max-pending-strings and --max-batch-size must be at least 1")
+
+	service=SudokuService(args.image_workers,args.string_workers,args.recognizer,args.backend,
+		args.max_pending_images or args.image_workers*4,args.max_pending_strings,args.max_batch_size,args.timeout,args.max_timeout,args.max_image_bytes,args.max_string_bytes)
+	SudokuRequestHandler.service=service
+	SudokuRequestHandler.verbose=args.verbose
+	server=SudokuHTTPServer((args.host,args.port),SudokuRequestHandler)
+	print("Serving on http://%s:%d"%server.server_address[:2],file=sys.stderr)
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		service.close()
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Solves sudoku strings of 81 characters (0 or . for blanks), one puzzle per line, from files or stdin
+Solutions are written in input order, one per line, to stdout or the output file, a blank or malformed line gets "Invalid Sudoku"
+USAGE: python3 sudokuStringSolver.py [puzzles.txt ...] [-o solutions.txt] [--workers 4] [--chunk-size 256] [--cache-size 10000]
+"""
+
+import argparse
+import fileinput
+import itertools
+import multiprocessing
+import sys
+import time
+from collections import deque
+import Sudoku_Solver.sudoku_solver as ss
+from Sudoku_Solver.solution_cache import SolutionCache
+
+NOT_SOLVABLE = "Not Solvable"
+INVALID_SUDOKU = "Invalid Sudoku"
+
+# Solution cache of this process, set by initialize_worker when --cache-size is given
+cache = None
+
+
+# Give this process a solution cache, every worker keeps its own
+def initialize_worker(cache_size, cache_path):
+    global cache
+    if cache_size:
+        cache = SolutionCache(cache_size, cache_path)
+
+# Solve one sudoku string and return the solution string
+def solve_puzzle(puzzle, backend):
+    if len(puzzle) != 81:
+        return INVALID_SUDOKU
+    solved_sudoku = ss.solve_sudoku(puzzle, backend=backend, cache=cache)
+    if solved_sudoku == False:
+        return NOT_SOLVABLE
+    return ss.generate_string_from_sudoku(solved_sudoku)
+
+# Solve a chunk of sudoku strings in a worker process
+# Returns the solutions and the number of them taken from the cache
+def solve_chunk(puzzles, backend):
+    hits = cache.hits if cache is not None else 0
+    solutions = [solve_puzzle(puzzle, backend) for puzzle in puzzles]
+    return solutions, (cache.hits if cache is not None else 0)-hits
+
+# Read lines lazily and group them into chunks
+# Blank lines are kept and answered with INVALID_SUDOKU, so output line N always belongs to input line N
+def read_chunks(lines, chunk_size):
+    puzzles = (line.strip() for line in lines)
+    while True:
+        chunk = list(itertools.islice(puzzles, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+# Solve all chunks and yield solved chunks in input order
+# At most max_pending chunks are in flight, so memory stays bounded for inputs of any size
+def solve_chunks(chunks, backend, workers, max_pending, cache_size=0, cache_path=None):
+    if workers == 1:
+        initialize_worker(cache_size, cache_path)
+        for chunk in chunks:
+            yield solve_chunk(chunk, backend)
+        return
+    with multiprocessing.Pool(workers, initialize_worker, (cache_size, cache_path)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(solve_chunk, (chunk, backend)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve sudoku strings, one per line, from files or stdin")
+    parser.add_argument("files", nargs="*", help="input files, stdin if none or -")
+    parser.add_argument("-o", "--output", help="output file, stdout if not given")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--backend", default="bitmask", choices=sorted(ss.backends))
+    parser.add_argument("--cache-size", type=int, default=0, help="solutions of repeated and isomorphic puzzles kept per worker, 0 disables the cache")
+    parser.add_argument("--cache-path", help="JSON file the cache starts from, written back at the end with --workers 1")
+    args = parser.parse_args()
+
+    if args.workers < 1 or args.chunk_size < 1:
+        parser.error("--workers and --chunk-size must be at least 1")
+    if args.cache_size < 0 or (args.cache_path and not args.cache_size):
+        parser.error("--cache-size must be positive and is needed by --cache-path")
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    solved = failed = cache_hits = 0
+    start = time.perf_counter()
+    try:
+        with fileinput.input(args.files or ("-",)) as lines:
+            chunks = read_chunks(lines, args.chunk_size)
+            for solutions, hits in solve_chunks(chunks, args.backend, args.workers, args.workers*4, args.cache_size, args.cache_path):
+                output.write("\n".join(solutions) + "\n")
+                unsolved = sum(1 for solution in solutions if solution in (NOT_SOLVABLE, INVALID_SUDOKU))
+                solved += len(solutions)-unsolved
+                failed += unsolved
+                cache_hits += hits
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter()-start
+    if cache is not None and args.cache_path:
+        cache.save()
+
+    rate = solved/elapsed if elapsed > 0 else 0.0
+    print("Solved %d puzzles in %.2f s (%.1f puzzles/s), %d not solvable or invalid" % (solved, elapsed, rate, failed), file=sys.stderr)
+    if args.cache_size:
+        print("Solution cache: %d of %d solved puzzles taken from the cache" % (cache_hits, solved), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Solves a sudoku puzzle filmed by a camera, from a video file, a camera index, an image sequence pattern (frames/%04d.png) or a directory of frames
+The grid is searched once, then its four corners are tracked from frame to frame with optical flow
+While the board stays still the perspective transform of the previous frame is reused, digits are only read and solved again
+when the contents of the cells change, otherwise the cached solution is drawn onto every frame
+USAGE: python3 sudokuVideoSolver.py video.mp4 [-o solved.mp4] [--show]
+"""
+
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from settings import *
+import Displayer.displayer as Displayer
+from Sudoku.resizeSudokuImage import ResizeSudokuImage
+from Extractor.extractSudokuPuzzle import ExtractSudokuPuzzle
+from Sudoku_Solver.solve_sudoku_from_image import SudokuSolver, CELL_MARGIN
+from Sudoku.sudokuImageError import SudokuImageError
+from sudokuImageBatchSolver import findImages
+
+#The board counts as still while no tracked corner moves more than this many pixels
+STILL_THRESHOLD=1.5
+#Change of the ink fraction of a cell above which its content counts as changed and the digits are read again
+CONTENT_CHANGE_THRESHOLD=0.05
+#Corners whose optical flow error is above this are lost and the grid is searched again
+TRACKING_ERROR_THRESHOLD=20.0
+#The tracked puzzle must cover at least this fraction of the frame, otherwise the grid is searched again
+MINIMUM_PUZZLE_AREA=0.05
+#Settings of the pyramidal Lucas-Kanade optical flow used to track the corners
+OPTICAL_FLOW_PARAMETERS=dict(winSize=(31,31),maxLevel=3,criteria=(cv2.TERM_CRITERIA_EPS|cv2.TERM_CRITERIA_COUNT,30,0.01))
+
+SOLUTION_COLOUR=(0,0,255)
+
+
+"""
+Yield the frames of a video file, camera index, image sequence pattern or directory of images
+"""
+def readFrames(source):
+	if(os.path.isdir(source)):
+		for imagePath in findImages([source]):
+			frame=cv2.imread(imagePath,cv2.IMREAD_COLOR)
+			if(frame is not None):
+				yield frame
+		return
+	capture=cv2.VideoCapture(int(source) if source.isdigit() else source)
+	if(not capture.isOpened()):
+		raise SudokuImageError("Error: Video cannot be read. Please check the path of the video or image sequence.")
+	try:
+		while True:
+			ok,frame=capture.read()
+			if(not ok):
+				return
+			yield frame
+	finally:
+		capture.release()
+
+"""
+Fraction of ink in the centre of every cell of the post processed puzzle, compared between frames to notice changed digits
+"""
+def cellSignature(postProcessed):
+	threshold=cv2.adaptiveThreshold(postProcessed,1,cv2.ADAPTIVE_THRESH_MEAN_C,cv2.THRESH_BINARY_INV,15,15)
+	cellSize=threshold.shape[0]//9
+	margin=int(cellSize*CELL_MARGIN)
+	cells=threshold[:cellSize*9,:cellSize*9].reshape(9,cellSize,9,cellSize).swapaxes(1,2)
+	return cells[:,:,margin:cellSize-margin,margin:cellSize-margin].mean(axis=(2,3))
+
+"""
+Check that tracked corners still form a convex puzzle of a sensible size inside the frame
+"""
+def isValidQuadrangle(quadrangle,frameShape):
+	height,width=frameShape[:2]
+	if((quadrangle<0).any() or (quadrangle[:,0]>=width).any() or (quadrangle[:,1]>=height).any()):
+		return False
+	if(not cv2.isContourConvex(quadrangle.reshape(4,1,2))):
+		return False
+	return cv2.contourArea(quadrangle)>=MINIMUM_PUZZLE_AREA*height*width
+
+
+class SudokuVideoSolver:
+	"""
+	Keeps the tracked corners, the transform and the solution of the last frames
+	Counters of grid searches, transform updates and digit readings show how much work the tracking saved
+	"""
+	def __init__(self,recognizer=None,display=None):
+		if(display is None):
+			display=Displayer.Display(mode="none")
+		self.display=display
+		self.recognizer=recognizer
+		self.extractor=None
+		#positions of the puzzle corners in the previous frame, the extractor keeps the corners its transform was computed from
+		self.corners=None
+		self.previousGray=None
+		self.signature=None
+		self.solutionOverlay=None
+		self.frames=0
+		self.detections=0
+		self.transformUpdates=0
+		self.recognitions=0
+
+	"""
+	Return the frame with the solution drawn onto the empty cells of the puzzle
+	"""
+	def processFrame(self,frame):
+		frame=ResizeSudokuImage(frame,MAXIMUM_WIDTH,MAXIMUM_HEIGHT,self.display).sudokuImage
+		gray=cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
+		self.frames+=1
+
+		#a frame without a grid or with corners OpenCV cannot warp (cv2.error) is shown as it is and the grid is searched again
+		try:
+			postProcessed=self.trackPuzzle(frame,gray)
+		except(SudokuImageError,cv2.error):
+			self.resetTracking()
+			postProcessed=None
+		self.previousGray=gray
+		if(postProcessed is None):
+			return frame
+
+		signature=cellSignature(postProcessed)
+		if(self.signature is None or np.abs(signature-self.signature).max()>CONTENT_CHANGE_THRESHOLD):
+			self.signature=signature
+			self.solutionOverlay=self.solvePuzzle(postProcessed)
+
+		if(self.solutionOverlay is not None):
+			#the overlay has the size of the post processed puzzle, so the current transform is scaled to it
+			width,height=self.extractor.warpedSize
+			overlaySize=self.solutionOverlay.shape[0]
+			scale=np.diag([overlaySize/float(width),overlaySize/float(height),1.0])
+			try:
+				overlay=cv2.warpPerspective(self.solutionOverlay,scale@self.extractor.perspectiveTransform,(frame.shape[1],frame.shape[0]),flags=cv2.WARP_INVERSE_MAP|cv2.INTER_LINEAR)
+			except cv2.error:
+				self.resetTracking()
+				return frame
+			mask=overlay.any(axis=2)
+			frame[mask]=overlay[mask]
+		return frame
+
+	"""
+	Forget the tracked puzzle, the next frame searches the whole grid and reads its digits again
+	"""
+	def resetTracking(self):
+		self.extractor=None
+		self.corners=None
+		self.signature=None
+		self.solutionOverlay=None
+
+	"""
+	Follow the corners of the puzzle into the new frame and return its post processed top down view
+	1. Without corners from the previous frame the whole grid search of ExtractSudokuPuzzle runs
+	2. Lost or degenerate corners start a new grid search
+	3. Corners that moved get a new transform, corners that stayed keep the previous one
+	"""
+	def trackPuzzle(self,frame,gray):
+		if(self.extractor is not None):
+			corners,status,error=cv2.calcOpticalFlowPyrLK(self.previousGray,gray,self.corners.reshape(4,1,2),None,**OPTICAL_FLOW_PARAMETERS)
+			corners=corners.reshape(4,2) if corners is not None else None
+			if(corners is None or not status.all() or error.max()>TRACKING_ERROR_THRESHOLD or not isValidQuadrangle(corners,frame.shape)):
+				self.extractor=None
+			else:
+				self.corners=corners
+				#small movements add up over frames, so they are measured from the corners of the current transform
+				if(np.abs(corners-self.extractor.quadrangle).max()<=STILL_THRESHOLD):
+					return self.extractor.rewarp(frame)
+				self.transformUpdates+=1
+				self.extractor=ExtractSudokuPuzzle(frame,self.display,quadrangle=corners)
+				return self.extractor.postProcessedExtracted
+
+		self.detections+=1
+		self.signature=None
+		self.extractor=ExtractSudokuPuzzle(frame,self.display)
+		self.corners=self.extractor.quadrangle
+		return self.extractor.postProcessedExtracted
+
+	"""
+	Read the digits and solve the puzzle, the solution is drawn once onto an empty top down image
+	which is warped onto every following frame. Returns None if the puzzle cannot be solved
+	"""
+	def solvePuzzle(self,postProcessed):
+		self.recognitions+=1
+		try:
+			sudokuSol=SudokuSolver(postProcessed,self.display,batchOCR=BATCH_OCR,recognizer=self.recognizer,fixedGrid=FIXED_GRID)
+		except(SudokuImageError,cv2.error):
+			return None
+
+		height,width=postProcessed.shape[:2]
+		overlay=np.zeros((height,width,3),dtype=np.uint8)
+		fontScale=height/9/40.0
+		for index,(given,digit) in enumerate(zip(sudokuSol.detected,sudokuSol.solution)):
+			if(given!="0"):
+				continue
+			row,column=divmod(index,9)
+			(w,h),baseline=cv2.getTextSize(digit,cv2.FONT_HERSHEY_COMPLEX,fontScale,2)
+			center=(int((column+0.5)*width/9-w/2),int((row+0.5)*height/9+h/2))
+			cv2.putText(overlay,digit,center,cv2.FONT_HERSHEY_COMPLEX,fontScale,SOLUTION_COLOUR,2,cv2.LINE_AA)
+		return overlay
+
+	def stats(self):
+		return {"frames":self.frames,"detections":self.detections,"transformUpdates":self.transformUpdates,"recognitions":self.recognitions}
+
+
+def main():
+	parser=argparse.ArgumentParser(description="Solve a sudoku puzzle in a video and draw the solution onto every frame")
+	parser.add_argument("source",help="video file, camera index, image sequence pattern or directory of frames")
+	parser.add_argument("-o","--output",help="video file the solved frames are written to")
+	parser.add_argument("--show",action="store_true",help="show the solved frames in a window, q stops")
+	parser.add_argument("--fps",type=float,default=30.0,help="frame rate of the output video")
+	parser.add_argument("--recognizer",default=DIGIT_RECOGNIZER,choices=("tesseract","classifier"))
+	args=parser.parse_args()
+
+	recognizer=None
+	if(args.recognizer=="classifier"):
+		from Recognizer.digitClassifier import DigitClassifier
+		recognizer=DigitClassifier()
+
+	videoSolver=SudokuVideoSolver(recognizer=recognizer)
+	writer=None
+	start=time.perf_counter()
+	try:
+		for frame in readFrames(args.source):
+			solvedFrame=videoSolver.processFrame(frame)
+			if(args.output):
+				if(writer is None):
+					writer=cv2.VideoWriter(args.output,cv2.VideoWriter_fourcc(*"mp4v"),args.fps,(solvedFrame.shape[1],solvedFrame.shape[0]))
+				writer.write(solvedFrame)
+			if(args.show):
+				cv2.imshow("Sudoku Puzzle",solvedFrame)
+				if(cv2.waitKey(1)&0xFF==ord("q")):
+					break
+	except SudokuImageError as error:
+		print(error,file=sys.stderr)
+		sys.exit(1)
+	finally:
+		if(writer is not None):
+			writer.release()
+		if(args.show):
+			cv2.destroyAllWindows()
+	elapsed=time.perf_counter()-start
+
+	stats=videoSolver.stats()
+	fps=stats["frames"]/elapsed if elapsed>0 else 0.0
+	print("Processed %d frames in %.2f s (%.1f frames/s), %d grid searches, %d transform updates, %d digit readings"%(stats["frames"],elapsed,fps,stats["detections"],stats["transformUpdates"],stats["recognitions"]),file=sys.stderr)
+
+if __name__=="__main__":
+	main()